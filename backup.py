@@ -1,111 +1,171 @@
 import os
 import json
+import shlex
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# VideoToolbox allows only a few concurrent encoder sessions; threads are
+# enough here because each worker just waits on an external ffmpeg process
+MAX_CONCURRENT_FFMPEG = 3
 
 def get_video_info(input_file):
-    command = f"ffprobe -v quiet -print_format json -show_format -show_streams '{input_file}'"
-    output = os.popen(command).read()
-    return json.loads(output)
+    # argv list instead of a shell string: no /bin/sh fork per probe and no
+    # breakage on filenames containing quotes
+    # Only the entries this script reads: ffprobe skips formatting the rest
+    # of the stream dictionaries instead of dumping everything as JSON
+    command = ["ffprobe", "-v", "quiet", "-print_format", "json",
+               "-show_entries",
+               "stream=codec_type,codec_name,width,height,side_data_list:format=duration,size",
+               input_file]
+    result = subprocess.run(command, capture_output=True, check=True)
+    return json.loads(result.stdout)
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov')
+
+# Encoding ladder: (bitrate, resolution, HDR metadata). Module-level so
+# importers can reuse it instead of rebuilding the list per run.
+QUALITIES = (
+    ("150k", "256x144", {}),
+    ("200k", "426x240", {}),
+    ("300k", "640x360", {}),
+    ("500k", "854x480", {}),
+    ("1000k", "1280x720", {}),
+    ("2000k", "1920x1080", {}),
+    ("4000k", "2560x1440", {}),
+    ("6000k", "3840x2160", {
+        "color_primaries": "bt2020",
+        "transfer_characteristics": "smpte2084",
+        "mastering_display_color_primaries": "bt2020",
+        "mastering_display_luminance": "1000"
+    }),
+    # Add higher quality settings cautiously
+    # ("8000k", "7680x4320", {
+    #     "color_primaries": "bt2020",
+    #     "transfer_characteristics": "smpte2084",
+    #     "mastering_display_color_primaries": "bt2020",
+    #     "mastering_display_luminance": "1000"
+    # })
+)
+
+def compress_file(input_path, input_file, output_dir, qualities):
+    print("Path: {0}".format(input_path))
+    video_info = get_video_info(input_path)
+
+    # Pull the streams apart once instead of re-indexing per lookup;
+    # audio-only or single-stream files no longer crash here
+    video_stream = video_info['streams'][0]
+    audio_stream = next((s for s in video_info['streams'] if s.get('codec_type') == 'audio'), None)
+
+    video_size = video_info['format']['size']
+    video_length = float(video_info['format']['duration'])
+    video_quality = video_stream['width']  # Assuming width represents quality
+    hdr_info = (video_stream.get('side_data_list') or [{}])[0].get('hdr')
+    audio_codec = audio_stream['codec_name'] if audio_stream else None
+
+
+    print(f"Video: {input_file}")
+    print(f"Size: {video_size}")
+    print(f"Length: {video_length} seconds")
+    print(f"Quality: {video_quality}")
+    print(f"HDR: {hdr_info}")
+    print(f"Audio Codec: {audio_codec}")
+
+    # Figure out which rungs still need producing before building the command
+    legs = []
+    for quality in qualities:
+        bitrate, resolution, hdr_metadata = quality
+
+        # Never upscale: rungs larger than the source waste encoder time
+        target_width, target_height = map(int, resolution.split('x'))
+        if target_width > video_stream['width'] and target_height > video_stream['height']:
+            print(f"Skipping upscale to {resolution} for {input_file}")
+            continue
+
+        output_file = f"{os.path.splitext(input_file)[0]}_{resolution}.mp4"
+        output_path = os.path.join(output_dir, output_file)
+
+        # Skip rungs already produced by a previous run
+        if os.path.exists(output_path) and os.path.getsize(output_path) > 1024:
+            print(f"Skipping existing output: {output_path}")
+            continue
+        legs.append((bitrate, resolution, hdr_metadata, output_path))
+
+    if not legs:
+        print(f"All outputs already exist for {input_file}")
+        return
+
+    # One ffmpeg invocation: split the decoded stream once and feed a scaler
+    # per rung, so the source is demuxed/decoded exactly once for all outputs
+    split_labels = ''.join(f"[v{i}]" for i in range(len(legs)))
+    scale_chains = ';'.join(f"[v{i}]scale={resolution}[o{i}]"
+                            for i, (_, resolution, _, _) in enumerate(legs))
+    filter_graph = f"[0:v]split={len(legs)}{split_labels};{scale_chains}"
+
+    command = ["ffmpeg", "-y", "-hwaccel", "videotoolbox", "-i", input_path,
+               "-filter_complex", filter_graph]
+    output_paths = []
+
+    for i, (bitrate, resolution, hdr_metadata, output_path) in enumerate(legs):
+        command += [
+            "-map", f"[o{i}]", "-map", "0:a:0?",
+            # videotoolbox ignores -preset/-crf; bitrate mode with a
+            # maxrate/bufsize cap keeps each rung on its ladder budget
+            # (-q:v would switch to constant quality and override -b:v)
+            "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", f"{int(bitrate.rstrip('k')) * 2}k",
+            "-metadata:s:v:0", f"color_primaries={hdr_metadata.get('color_primaries', 'bt709')}",  # Default to bt709 if HDR metadata not present
+            "-metadata:s:v:0", f"transfer_characteristics={hdr_metadata.get('transfer_characteristics', 'bt709')}",
+            "-metadata:s:v:0", f"mastering_display_color_primaries={hdr_metadata.get('mastering_display_color_primaries', 'bt709')}",
+            "-metadata:s:v:0", f"mastering_display_luminance={hdr_metadata.get('mastering_display_luminance', '100')}",
+            "-c:v", "h264_videotoolbox", "-realtime", "0", "-allow_sw", "1",
+            # nv12 is the VT encoder's native format; +faststart puts
+            # the moov atom at the file head for streaming reads
+            "-pix_fmt", "nv12", "-movflags", "+faststart",
+            "-c:a", "aac", "-b:a", "128k",
+            output_path,
+        ]
+        output_paths.append(output_path)
+
+    print(f"Executing command: {shlex.join(command)}")
+    # The exit code is authoritative: a crashed encode can still leave a
+    # partial file behind, so os.path.exists would report false successes.
+    # DEVNULL stdin stops ffmpeg's interactive key handling from reading
+    # the terminal while several encodes share it
+    result = subprocess.run(command, stdin=subprocess.DEVNULL)
+    if result.returncode == 0:
+        for output_path in output_paths:
+            print(f"Compression successful: {output_path}")
+    else:
+        print(f"ffmpeg failed with exit code {result.returncode}")
+        for output_path in output_paths:
+            print(f"Compression failed: {output_path}")
 
 def compress_videos(input_dir, output_dir, qualities):
     print("Compressing videos...")
-    input_files = [f for f in os.listdir(input_dir) if f.endswith(('.mp4', '.MOV'))]
+    # exist_ok avoids a racy exists-then-create pair; first run just works
+    os.makedirs(output_dir, exist_ok=True)
+    with os.scandir(input_dir) as entries:
+        # `._*` are AppleDouble metadata files macOS leaves on shared storage;
+        # they carry no video data and would just fail the probe
+        input_files = [e.name for e in entries
+                       if e.is_file() and not e.name.startswith('._')
+                       and e.name.lower().endswith(VIDEO_EXTENSIONS)]
     print("input_files: ".format(input_files))
-    
+
     if len(input_files) == 0:
         print("No videos to compress")
     else:
-        for input_file in input_files:
-            input_path = os.path.join(input_dir, input_file)
-            print("Path: {0}".format(input_path))
-            video_info = get_video_info(input_path)
-            
-            # Check if HDR metadata is available
-            if 'side_data_list' in video_info['streams'][0] and video_info['streams'][0]['side_data_list']:
-                hdr_info = video_info['streams'][0]['side_data_list'][0].get('hdr', None)
-            else:
-                hdr_info = None
-            
-            video_size = video_info['format']['size']
-            video_length = float(video_info['format']['duration'])
-            video_quality = video_info['streams'][0]['width']  # Assuming width represents quality
-            hdr_info = video_info['streams'][0]['side_data_list'][0]['hdr'] if video_info['streams'][0]['side_data_list'] else None
-            audio_codec = video_info['streams'][1]['codec_name']
-            
-            
-            
-            print(f"Video: {input_file}")
-            print(f"Size: {video_size}")
-            print(f"Length: {video_length} seconds")
-            print(f"Quality: {video_quality}")
-            print(f"HDR: {hdr_info}")
-            print(f"Audio Codec: {audio_codec}")
-            
-            for quality in qualities:
-                bitrate, resolution, hdr_metadata = quality
-                output_file = f"{os.path.splitext(input_file)[0]}_{resolution}.mp4"
-                output_path = os.path.join(output_dir, output_file)
-                
-                # command = (
-                #     f"ffmpeg -i '{input_path}' "
-                #     f"-vf scale={resolution} "
-                #     f"-b:v {bitrate} "
-                #     f"-metadata:s:v:0 color_primaries={hdr_metadata.get('color_primaries', 'bt709')} "  # Default to bt709 if HDR metadata not present
-                #     f"-metadata:s:v:0 transfer_characteristics={hdr_metadata.get('transfer_characteristics', 'bt709')} "
-                #     f"-metadata:s:v:0 mastering_display_color_primaries={hdr_metadata.get('mastering_display_color_primaries', 'bt709')} "
-                #     f"-metadata:s:v:0 mastering_display_luminance={hdr_metadata.get('mastering_display_luminance', '100')} "
-                #     f"-c:v libx264 -preset fast -crf 23 "
-                #     f"-c:a aac -b:a 128k '{output_path}'"
-                # )
-                
-                command = (
-                    f"ffmpeg -hwaccel videotoolbox -i '{input_path}' "
-                    f"-vf scale={resolution} "
-                    f"-b:v {bitrate} "
-                    f"-metadata:s:v:0 color_primaries={hdr_metadata.get('color_primaries', 'bt709')} "
-                    f"-metadata:s:v:0 transfer_characteristics={hdr_metadata.get('transfer_characteristics', 'bt709')} "
-                    f"-metadata:s:v:0 mastering_display_color_primaries={hdr_metadata.get('mastering_display_color_primaries', 'bt709')} "
-                    f"-metadata:s:v:0 mastering_display_luminance={hdr_metadata.get('mastering_display_luminance', '100')} "
-                    f"-c:v h264_videotoolbox -preset fast -crf 23 "
-                    f"-c:a aac -b:a 128k '{output_path}'"
-                )
-                
-                # command = (f"ffmpeg -i '{input_path}' -vf scale={resolution} -c:v libx264 -preset fast -crf 23 -c:a aac -b:a 128k '{output_path}'")
-                
-                print(f"Executing command: {command}")
-                os.system(command)
-                
-                if os.path.exists(output_path):
-                    print(f"Compression successful: {output_path}")
-                else:
-                    print(f"Compression failed: {output_path}")
-    
-        
+        # Files are independent; run a few ffmpeg processes side by side
+        # instead of leaving the encoder idle between files
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FFMPEG) as executor:
+            futures = [executor.submit(compress_file, os.path.join(input_dir, input_file),
+                                       input_file, output_dir, qualities)
+                       for input_file in input_files]
+            for future in futures:
+                future.result()
+
 
 if __name__ == "__main__":
     input_directory = "lambrk_videos/pending/"
     output_directory = "lambrk_videos/final"
-    
-    # List of video qualities (bitrate, resolution, HDR metadata)
-    qualities = [
-        ("150k", "256x144", {}),
-        ("200k", "426x240", {}),
-        ("300k", "640x360", {}),
-        ("500k", "854x480", {}),
-        ("1000k", "1280x720", {}),
-        ("2000k", "1920x1080", {}),
-        ("4000k", "2560x1440", {}),
-        ("6000k", "3840x2160", {
-            "color_primaries": "bt2020",
-            "transfer_characteristics": "smpte2084",
-            "mastering_display_color_primaries": "bt2020",
-            "mastering_display_luminance": "1000"
-        }),
-        # ("8000k", "7680x4320", {
-        #     "color_primaries": "bt2020",
-        #     "transfer_characteristics": "smpte2084",
-        #     "mastering_display_color_primaries": "bt2020",
-        #     "mastering_display_luminance": "1000"
-        # })
-    ]
-    
-    compress_videos(input_directory, output_directory, qualities)
+
+    compress_videos(input_directory, output_directory, QUALITIES)
@@ -1,50 +1,194 @@
 import os
 import json
+import multiprocessing
+import shlex
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Cap per-process encoder threads so pool_size * threads stays close to the
+# physical core count.
+FFMPEG_THREADS = 4
+# VideoToolbox only sustains a few concurrent encoder sessions, so the pool
+# is bounded by that as well as by cores-per-encode
+VIDEOTOOLBOX_SESSIONS = 3
+MAX_WORKERS = max(1, min(VIDEOTOOLBOX_SESSIONS,
+                         multiprocessing.cpu_count() // FFMPEG_THREADS))
 
 def get_video_info(input_file):
     """Extracts video information using ffprobe."""
-    command = f"ffprobe -v quiet -print_format json -show_format -show_streams '{input_file}'"
-    output = os.popen(command).read()
-    return json.loads(output)
+    # argv list instead of a shell string: no /bin/sh fork per probe and no
+    # breakage on filenames containing quotes
+    # Only the entries this script reads: ffprobe skips formatting the rest
+    # of the stream dictionaries instead of dumping everything as JSON
+    command = ["ffprobe", "-v", "quiet", "-print_format", "json",
+               "-show_entries",
+               "stream=codec_type,codec_name,width,height,bit_rate,side_data_list:format=duration",
+               input_file]
+    result = subprocess.run(command, capture_output=True, check=True)
+    return json.loads(result.stdout)
+
+def run_ffmpeg(command):
+    """Runs an ffmpeg command given as an argv list and returns its exit code."""
+    print(f"Executing command: {shlex.join(command)}")
+    # DEVNULL stdin stops ffmpeg's interactive key handling from reading
+    # the terminal while several pool workers share it
+    return subprocess.run(command, stdin=subprocess.DEVNULL).returncode
+
+def get_audio_opts(video_info):
+    """Picks audio options for a source: copy the stream when it is already
+    AAC at or below the 128k target, otherwise re-encode."""
+    audio_stream = next((s for s in video_info.get('streams', []) if s.get('codec_type') == 'audio'), None)
+    if audio_stream and audio_stream.get('codec_name') == 'aac':
+        bit_rate = int(audio_stream.get('bit_rate', 0) or 0)
+        if 0 < bit_rate <= 128000:
+            return ["-c:a", "copy"]
+    return ["-c:a", "aac", "-b:a", "128k"]
+
+def double_bitrate(bitrate):
+    """Doubles a bitrate string like '150k' (used for -bufsize)."""
+    return f"{int(bitrate.rstrip('k')) * 2}k"
+
+# Formatted -metadata fragments, keyed by the rung's HDR dict contents. The
+# ladder reuses the same handful of metadata dicts across every rung of every
+# file, so each distinct fragment is formatted once instead of per command.
+_METADATA_OPTS_CACHE = {}
+
+def get_metadata_opts(hdr_metadata):
+    """Returns the (cached) -metadata argv fragment for a rung's HDR dict."""
+    key = tuple(sorted((hdr_metadata or {}).items()))
+    opts = _METADATA_OPTS_CACHE.get(key)
+    if opts is None:
+        hdr_metadata = dict(key)
+        opts = [
+            "-metadata:s:v:0", f"color_primaries={hdr_metadata.get('color_primaries', 'bt709')}",
+            "-metadata:s:v:0", f"transfer_characteristics={hdr_metadata.get('transfer_characteristics', 'bt709')}",
+            "-metadata:s:v:0", f"mastering_display_color_primaries={hdr_metadata.get('mastering_display_color_primaries', 'bt709')}",
+            "-metadata:s:v:0", f"mastering_display_luminance={hdr_metadata.get('mastering_display_luminance', '100')}",
+        ]
+        _METADATA_OPTS_CACHE[key] = opts
+    return opts
+
+def build_compress_command(input_file, output_file, bitrate, resolution, hdr_metadata=None, audio_opts=None):
+    """Builds the ffmpeg argv list for compressing a single video file."""
+    audio_opts = audio_opts or ["-c:a", "aac", "-b:a", "128k"]
+    return [
+        "ffmpeg", "-y", "-hwaccel", "videotoolbox", "-i", input_file,
+        "-vf", f"scale={resolution}",
+        # videotoolbox ignores -preset/-crf; bitrate mode with a
+        # maxrate/bufsize cap keeps each rung on its ladder budget
+        # (-q:v would switch to constant quality and override -b:v)
+        "-b:v", bitrate, "-maxrate", bitrate, "-bufsize", double_bitrate(bitrate),
+    ] + get_metadata_opts(hdr_metadata) + [
+        "-c:v", "h264_videotoolbox", "-realtime", "0", "-allow_sw", "1",
+        # nv12 is the VT encoder's native input format; +faststart moves the
+        # moov atom to the file head so players don't read to EOF to index
+        "-pix_fmt", "nv12", "-movflags", "+faststart",
+        "-threads", str(FFMPEG_THREADS),
+    ] + audio_opts + [
+        output_file,
+    ]
+
+def output_is_complete(output_file):
+    """Returns True if an output from a previous run already exists."""
+    return os.path.exists(output_file) and os.path.getsize(output_file) > 1024
 
 def compress_video(input_file, output_file, bitrate, resolution, hdr_metadata=None):
     """Compresses a single video file with specified settings."""
-    # Construct ffmpeg command for video compression
-    command = (
-        f"ffmpeg -hwaccel videotoolbox -i '{input_file}' "
-        f"-vf scale={resolution} "
-        f"-b:v {bitrate} "
-        f"-metadata:s:v:0 color_primaries={hdr_metadata.get('color_primaries', 'bt709')} "
-        f"-metadata:s:v:0 transfer_characteristics={hdr_metadata.get('transfer_characteristics', 'bt709')} "
-        f"-metadata:s:v:0 mastering_display_color_primaries={hdr_metadata.get('mastering_display_color_primaries', 'bt709')} "
-        f"-metadata:s:v:0 mastering_display_luminance={hdr_metadata.get('mastering_display_luminance', '100')} "
-        f"-c:v h264_videotoolbox -preset fast -crf 23 "
-        f"-c:a aac -b:a 128k '{output_file}'"
-    )
-
-    # Execute ffmpeg command
-    print(f"Executing command: {command}")
-    os.system(command)
-
-    # Check if output file was created successfully
-    if os.path.exists(output_file):
+    if output_is_complete(output_file):
+        print(f"Skipping existing output: {output_file}")
+        return
+    command = build_compress_command(input_file, output_file, bitrate, resolution, hdr_metadata)
+    # The exit code is authoritative: a crashed encode can still leave a
+    # partial file behind, so os.path.exists would report false successes
+    if run_ffmpeg(command) == 0:
         print(f"Compression successful: {output_file}")
     else:
         print(f"Compression failed: {output_file}")
 
+def rung_pixels(resolution):
+    """Returns the pixel count of a WxH resolution string."""
+    width, height = resolution.split('x')
+    return int(width) * int(height)
+
+def compress_file_cascade(input_path, output_dir, base_name, qualities, audio_opts=None):
+    """Cascade-encodes one file: the highest rung from the source, then each
+    lower rung from the previous output, so the scale filter never processes
+    full-resolution pixels more than once."""
+    results = []
+    source = input_path
+    for bitrate, resolution, hdr in qualities:
+        output_path = os.path.join(output_dir, base_name + f"_{resolution}.mp4")
+        # Interrupted batches resume instead of redoing finished rungs
+        if output_is_complete(output_path):
+            print(f"Skipping existing output: {output_path}")
+            ok = True
+        else:
+            returncode = run_ffmpeg(build_compress_command(source, output_path, bitrate, resolution, hdr, audio_opts))
+            ok = returncode == 0
+        results.append((output_path, ok))
+        if ok:
+            source = output_path
+            # The first rung's audio already matches the target, so every
+            # later rung can copy it instead of re-encoding
+            audio_opts = ["-c:a", "copy"]
+    return results
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov')
+
+# Encoding ladder: (bitrate, resolution, HDR metadata). Module-level so
+# importers can reuse it instead of rebuilding the list per run.
+QUALITIES = (
+    ("150k", "256x144", {}),
+    ("200k", "426x240", {}),
+    ("300k", "640x360", {}),
+    ("500k", "854x480", {}),
+    ("1000k", "1280x720", {}),
+    ("2000k", "1920x1080", {}),
+    ("4000k", "2560x1440", {}),
+    ("6000k", "3840x2160", {
+        "color_primaries": "bt2020",
+        "transfer_characteristics": "smpte2084",
+        "mastering_display_color_primaries": "bt2020",
+        "mastering_display_luminance": "1000"
+    }),
+    # Add higher quality settings cautiously
+    # ("8000k", "7680x4320", {
+    #     "color_primaries": "bt2020",
+    #     "transfer_characteristics": "smpte2084",
+    #     "mastering_display_color_primaries": "bt2020",
+    #     "mastering_display_luminance": "1000"
+    # })
+)
+
 def compress_videos(input_dir, output_dir, qualities):
     """Compresses all videos in the input directory with specified qualities."""
     print("Compressing videos...")
-    input_files = [f for f in os.listdir(input_dir) if f.endswith(('.mp4', '.MOV'))]
+    # exist_ok avoids a racy exists-then-create pair; first run just works
+    os.makedirs(output_dir, exist_ok=True)
+    with os.scandir(input_dir) as entries:
+        # `._*` are AppleDouble metadata files macOS leaves on shared storage;
+        # they carry no video data and would just fail the probe
+        input_files = [e.name for e in entries
+                       if e.is_file() and not e.name.startswith('._')
+                       and e.name.lower().endswith(VIDEO_EXTENSIONS)]
 
     if not input_files:
         print("No videos to compress")
         return
 
-    for input_file in input_files:
-        input_path = os.path.join(input_dir, input_file)
-        video_info = get_video_info(input_path)
+    # Sort rungs high->low so each lower rung transcodes from the previous
+    # output instead of re-scaling the full-resolution source
+    qualities = sorted(qualities, key=lambda q: rung_pixels(q[1]), reverse=True)
 
+    # Probe every input concurrently before building tasks; each probe just
+    # waits on an ffprobe subprocess, so threads overlap the fork+exec latency
+    input_paths = [os.path.join(input_dir, f) for f in input_files]
+    with ThreadPoolExecutor(max_workers=min(16, len(input_files))) as probe_pool:
+        video_infos = list(probe_pool.map(get_video_info, input_paths))
+
+    # Build one cascade task per video
+    tasks = []
+    for input_file, input_path, video_info in zip(input_files, input_paths, video_infos):
         # Extract video information
         video_length = float(video_info['format']['duration'])
         video_quality = video_info['streams'][0]['width']  # Assuming width represents quality
@@ -55,40 +199,35 @@ def compress_videos(input_dir, output_dir, qualities):
         print(f"Quality: {video_quality}")
         print(f"HDR: {hdr_metadata}")
 
+        # Never upscale: drop rungs larger than the source before the cascade
+        # starts, so no encoder time goes into renditions nobody should serve
+        src_width = video_info['streams'][0]['width']
+        src_height = video_info['streams'][0]['height']
+        file_qualities = []
         for bitrate, resolution, hdr in qualities:
-            output_file = os.path.splitext(input_file)[0] + f"_{resolution}.mp4"
-            output_path = os.path.join(output_dir, output_file)
+            target_width, target_height = map(int, resolution.split('x'))
+            if target_width > src_width and target_height > src_height:
+                print(f"Skipping upscale to {resolution} for {input_file}")
+                continue
+            file_qualities.append((bitrate, resolution, hdr))
+        if not file_qualities:
+            continue
+
+        tasks.append((input_path, output_dir, os.path.splitext(input_file)[0], file_qualities, get_audio_opts(video_info)))
 
-            # Compress video with specified settings
-            compress_video(input_path, output_path, bitrate, resolution, hdr)
+    # Run per-file cascades concurrently with a bounded worker pool
+    with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [executor.submit(compress_file_cascade, *task) for task in tasks]
+        for future in futures:
+            for output_path, ok in future.result():
+                if ok:
+                    print(f"Compression successful: {output_path}")
+                else:
+                    print(f"Compression failed: {output_path}")
 
 if __name__ == "__main__":
     input_directory = "lambrk_videos/pending/"
     output_directory = "lambrk_videos/final/"
 
-    # List of video qualities (bitrate, resolution, HDR metadata)
-    qualities = [
-        ("150k", "256x144", {}),
-        ("200k", "426x240", {}),
-        ("300k", "640x360", {}),
-        ("500k", "854x480", {}),
-        ("1000k", "1280x720", {}),
-        ("2000k", "1920x1080", {}),
-        ("4000k", "2560x1440", {}),
-        ("6000k", "3840x2160", {
-            "color_primaries": "bt2020",
-            "transfer_characteristics": "smpte2084",
-            "mastering_display_color_primaries": "bt2020",
-            "mastering_display_luminance": "1000"
-        }),
-        # Add higher quality settings cautiously
-        # ("8000k", "7680x4320", {
-        #     "color_primaries": "bt2020",
-        #     "transfer_characteristics": "smpte2084",
-        #     "mastering_display_color_primaries": "bt2020",
-        #     "mastering_display_luminance": "1000"
-        # })
-    ]
-
-    # Compress videos using specified qualities
-    compress_videos(input_directory, output_directory, qualities)
+    # Compress videos using the module-level encoding ladder
+    compress_videos(input_directory, output_directory, QUALITIES)
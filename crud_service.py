@@ -3,28 +3,94 @@ CRUD Service Layer for Lambrk Video Compressor
 Handles all database operations for compression jobs, videos, tasks, and metrics
 """
 import os
-import json
-from datetime import datetime
+import subprocess
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import cache, cached_property
 from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_, or_
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc, func, and_, or_, insert, case, update, bindparam, lambda_stmt
 
 from database_models import (
     CompressionJob, VideoFile, CompressionTask, SystemMetrics,
     get_db_manager, Base
 )
 
-class CompressionJobService:
-    """Service for managing compression jobs"""
-    
-    def __init__(self):
-        self.db_manager = get_db_manager()
-    
-    def create_job(self, job_name: str, input_folder: str, output_folder: str, 
-                   dolby_atmos_enabled: bool = True) -> CompressionJob:
-        """Create a new compression job"""
+def probe_video(filepath: str) -> Optional[Dict[str, Any]]:
+    """Probe a video file once with ffprobe and return its parsed metadata.
+
+    Only width/height/duration are needed here, so the probe asks for
+    exactly those entries as CSV instead of the full format+streams JSON
+    document — a few bytes of output and no JSON parse per file.
+
+    Returns a dict with width, height, duration_seconds, size_mb and
+    is_portrait, or None if probing failed.
+    """
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0",
+             "-show_entries", "stream=width,height:format=duration",
+             "-of", "csv=p=0", filepath],
+            capture_output=True, text=True, check=True
+        )
+        lines = [line for line in result.stdout.splitlines() if line.strip()]
+        if not lines:
+            return None
+
+        width, height = (int(v) for v in lines[0].split(',')[:2])
+        duration = float(lines[1].split(',')[0]) if len(lines) > 1 else 0.0
+        return {
+            'width': width,
+            'height': height,
+            'duration_seconds': duration,
+            'size_mb': os.path.getsize(filepath) / (1024 * 1024),
+            'is_portrait': height > width
+        }
+    except Exception as e:
+        print(f"Error probing video {filepath}: {e}")
+        return None
+
+class BaseService:
+    """Shared session handling for the CRUD services"""
+
+    def __init__(self, db_manager=None):
+        # Accepting a manager lets setup/test harnesses reuse one configured
+        # engine and pool instead of each service resolving the default
+        self.db_manager = db_manager or get_db_manager()
+
+    @contextmanager
+    def _session(self, session: Session = None):
+        """Yield a database session, committing and closing only if we opened it.
+
+        Passing an existing session lets callers batch several service calls
+        into a single transaction instead of paying a connection checkout and
+        commit per method call.
+        """
+        if session is not None:
+            yield session
+            return
+
         session = self.db_manager.get_session()
+        # Keep returned ORM objects readable after the session closes
+        session.expire_on_commit = False
         try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+class CompressionJobService(BaseService):
+    """Service for managing compression jobs"""
+
+    def create_job(self, job_name: str, input_folder: str, output_folder: str,
+                   dolby_atmos_enabled: bool = True, session: Session = None) -> CompressionJob:
+        """Create a new compression job"""
+        with self._session(session) as s:
             job = CompressionJob(
                 job_name=job_name,
                 input_folder=input_folder,
@@ -32,69 +98,91 @@ class CompressionJobService:
                 dolby_atmos_enabled=dolby_atmos_enabled,
                 status='pending'
             )
-            session.add(job)
-            session.commit()
-            session.refresh(job)
+            s.add(job)
+            s.flush()
             return job
-        finally:
-            session.close()
-    
-    def get_job(self, job_id: int) -> Optional[CompressionJob]:
+
+    def get_job(self, job_id: int, session: Session = None) -> Optional[CompressionJob]:
         """Get a compression job by ID"""
-        session = self.db_manager.get_session()
-        try:
-            return session.query(CompressionJob).filter(CompressionJob.id == job_id).first()
-        finally:
-            session.close()
-    
-    def get_all_jobs(self, limit: int = 100, offset: int = 0) -> List[CompressionJob]:
+        with self._session(session) as s:
+            return s.query(CompressionJob).filter(CompressionJob.id == job_id).first()
+
+    def get_all_jobs(self, limit: int = 100, offset: int = 0, session: Session = None) -> List[CompressionJob]:
         """Get all compression jobs with pagination"""
-        session = self.db_manager.get_session()
-        try:
-            return session.query(CompressionJob)\
-                         .order_by(desc(CompressionJob.created_at))\
-                         .offset(offset)\
-                         .limit(limit)\
-                         .all()
-        finally:
-            session.close()
-    
-    def get_jobs_by_status(self, status: str) -> List[CompressionJob]:
+        with self._session(session) as s:
+            return s.query(CompressionJob)\
+                    .order_by(desc(CompressionJob.created_at))\
+                    .offset(offset)\
+                    .limit(limit)\
+                    .all()
+
+    def get_all_jobs_with_stats(self, limit: int = 100, offset: int = 0,
+                                session: Session = None) -> List[tuple]:
+        """Get jobs with aggregated task counts in one round-trip.
+
+        Returns (job, pending_tasks, completed_tasks) tuples. The LEFT JOIN
+        against a grouped task subquery replaces the 1+N pattern of fetching
+        jobs and then issuing a statistics query per job.
+        """
+        with self._session(session) as s:
+            task_stats = s.query(
+                CompressionTask.job_id.label('job_id'),
+                func.sum(case((CompressionTask.status == 'pending', 1), else_=0)).label('pending_tasks'),
+                func.sum(case((CompressionTask.status == 'completed', 1), else_=0)).label('completed_tasks'),
+            ).group_by(CompressionTask.job_id).subquery()
+
+            rows = s.query(
+                        CompressionJob,
+                        task_stats.c.pending_tasks,
+                        task_stats.c.completed_tasks,
+                    )\
+                    .outerjoin(task_stats, task_stats.c.job_id == CompressionJob.id)\
+                    .order_by(desc(CompressionJob.created_at))\
+                    .offset(offset)\
+                    .limit(limit)\
+                    .all()
+            # Jobs with no tasks yet come back with NULL sums
+            return [(job, pending or 0, completed or 0) for job, pending, completed in rows]
+
+    def get_jobs_by_status(self, status: str, session: Session = None) -> List[CompressionJob]:
         """Get jobs by status (pending, processing, completed, failed, cancelled)"""
-        session = self.db_manager.get_session()
-        try:
-            return session.query(CompressionJob)\
-                         .filter(CompressionJob.status == status)\
-                         .order_by(desc(CompressionJob.created_at))\
-                         .all()
-        finally:
-            session.close()
-    
-    def update_job_status(self, job_id: int, status: str, error_message: str = None) -> bool:
+        with self._session(session) as s:
+            return s.query(CompressionJob)\
+                    .filter(CompressionJob.status == status)\
+                    .order_by(desc(CompressionJob.created_at))\
+                    .all()
+
+    def get_status_counts(self, session: Session = None) -> Dict[str, int]:
+        """Get job counts grouped by status in a single query"""
+        with self._session(session) as s:
+            rows = s.query(CompressionJob.status, func.count())\
+                    .group_by(CompressionJob.status)\
+                    .all()
+            return {status: count for status, count in rows}
+
+    def update_job_status(self, job_id: int, status: str, error_message: str = None,
+                          session: Session = None) -> bool:
         """Update job status"""
-        session = self.db_manager.get_session()
-        try:
-            job = session.query(CompressionJob).filter(CompressionJob.id == job_id).first()
+        with self._session(session) as s:
+            job = s.query(CompressionJob).filter(CompressionJob.id == job_id).first()
             if job:
                 job.status = status
                 if error_message:
                     job.error_message = error_message
                 if status == 'processing' and not job.started_at:
-                    job.started_at = datetime.now()
+                    job.started_at = func.now()
                 elif status in ['completed', 'failed', 'cancelled']:
-                    job.completed_at = datetime.now()
-                session.commit()
+                    job.completed_at = func.now()
+                self.db_manager.invalidate_job_progress(job_id)
                 return True
             return False
-        finally:
-            session.close()
-    
-    def update_job_progress(self, job_id: int, completed_tasks: int = None, 
-                           total_tasks: int = None, concurrent_workers: int = None) -> bool:
+
+    def update_job_progress(self, job_id: int, completed_tasks: int = None,
+                           total_tasks: int = None, concurrent_workers: int = None,
+                           session: Session = None) -> bool:
         """Update job progress information"""
-        session = self.db_manager.get_session()
-        try:
-            job = session.query(CompressionJob).filter(CompressionJob.id == job_id).first()
+        with self._session(session) as s:
+            job = s.query(CompressionJob).filter(CompressionJob.id == job_id).first()
             if job:
                 if completed_tasks is not None:
                     job.completed_tasks = completed_tasks
@@ -102,38 +190,28 @@ class CompressionJobService:
                     job.total_tasks = total_tasks
                 if concurrent_workers is not None:
                     job.concurrent_workers = concurrent_workers
-                session.commit()
+                self.db_manager.invalidate_job_progress(job_id)
                 return True
             return False
-        finally:
-            session.close()
-    
-    def delete_job(self, job_id: int) -> bool:
+
+    def delete_job(self, job_id: int, session: Session = None) -> bool:
         """Delete a compression job and all related data"""
-        session = self.db_manager.get_session()
-        try:
-            job = session.query(CompressionJob).filter(CompressionJob.id == job_id).first()
+        with self._session(session) as s:
+            job = s.query(CompressionJob).filter(CompressionJob.id == job_id).first()
             if job:
-                session.delete(job)
-                session.commit()
+                s.delete(job)
                 return True
             return False
-        finally:
-            session.close()
 
-class VideoFileService:
+class VideoFileService(BaseService):
     """Service for managing video files"""
-    
-    def __init__(self):
-        self.db_manager = get_db_manager()
-    
-    def create_video(self, job_id: int, filename: str, filepath: str, 
+
+    def create_video(self, job_id: int, filename: str, filepath: str,
                     original_size_mb: float = None, original_width: int = None,
                     original_height: int = None, duration_seconds: float = None,
-                    is_portrait: bool = False) -> VideoFile:
+                    is_portrait: bool = False, session: Session = None) -> VideoFile:
         """Create a new video file record"""
-        session = self.db_manager.get_session()
-        try:
+        with self._session(session) as s:
             video = VideoFile(
                 job_id=job_id,
                 filename=filename,
@@ -145,51 +223,55 @@ class VideoFileService:
                 is_portrait=is_portrait,
                 status='pending'
             )
-            session.add(video)
-            session.commit()
-            session.refresh(video)
+            s.add(video)
+            s.flush()
             return video
-        finally:
-            session.close()
-    
-    def get_videos_by_job(self, job_id: int) -> List[VideoFile]:
+
+    def get_videos_by_job(self, job_id: int, session: Session = None) -> List[VideoFile]:
         """Get all videos for a specific job"""
-        session = self.db_manager.get_session()
-        try:
-            return session.query(VideoFile)\
-                         .filter(VideoFile.job_id == job_id)\
-                         .all()
-        finally:
-            session.close()
-    
-    def update_video_status(self, video_id: int, status: str, error_message: str = None) -> bool:
+        with self._session(session) as s:
+            return s.query(VideoFile)\
+                    .filter(VideoFile.job_id == job_id)\
+                    .all()
+
+    def update_video_status(self, video_id: int, status: str, error_message: str = None,
+                            session: Session = None) -> bool:
         """Update video processing status"""
-        session = self.db_manager.get_session()
-        try:
-            video = session.query(VideoFile).filter(VideoFile.id == video_id).first()
+        with self._session(session) as s:
+            video = s.query(VideoFile).filter(VideoFile.id == video_id).first()
             if video:
                 video.status = status
                 if error_message:
                     video.error_message = error_message
                 if status in ['completed', 'failed']:
-                    video.processed_at = datetime.now()
-                session.commit()
+                    video.processed_at = func.now()
                 return True
             return False
-        finally:
-            session.close()
 
-class CompressionTaskService:
+# Status transitions run thousands of times per job; lambda_stmt caches the
+# compiled SQL so each execution skips statement compilation (~50us apiece).
+# Bind names must not collide with column names appearing in the SET clause
+# ('id', 'worker_id'), which SQLAlchemy reserves for its per-column binds.
+_claim_task_stmt = lambda_stmt(
+    lambda: update(CompressionTask)
+    .where(CompressionTask.id == bindparam('task_id'),
+           CompressionTask.status == 'pending')
+    .values(status='processing', started_at=func.now(),
+            worker_id=bindparam('claimed_by')))
+
+_finish_task_stmt = lambda_stmt(
+    lambda: update(CompressionTask)
+    .where(CompressionTask.id == bindparam('task_id'))
+    .values(status=bindparam('new_status'), completed_at=func.now()))
+
+class CompressionTaskService(BaseService):
     """Service for managing compression tasks"""
-    
-    def __init__(self):
-        self.db_manager = get_db_manager()
-    
+
     def create_task(self, job_id: int, video_id: int, quality_profile: str,
-                   bitrate: str, resolution: str, hdr_metadata: dict = None) -> CompressionTask:
+                   bitrate: str, resolution: str, hdr_metadata: dict = None,
+                   session: Session = None) -> CompressionTask:
         """Create a new compression task"""
-        session = self.db_manager.get_session()
-        try:
+        with self._session(session) as s:
             task = CompressionTask(
                 job_id=job_id,
                 video_id=video_id,
@@ -199,42 +281,68 @@ class CompressionTaskService:
                 hdr_metadata=hdr_metadata,
                 status='pending'
             )
-            session.add(task)
-            session.commit()
-            session.refresh(task)
+            s.add(task)
+            s.flush()
             return task
-        finally:
-            session.close()
-    
-    def get_tasks_by_job(self, job_id: int, status: str = None) -> List[CompressionTask]:
+
+    def create_tasks_bulk(self, mappings: List[Dict[str, Any]], session: Session = None) -> int:
+        """Insert many task rows in one statement.
+
+        Use this for whole batches instead of paying a create_task
+        round-trip per (video, quality) pair; returns the row count.
+        """
+        if not mappings:
+            return 0
+        with self._session(session) as s:
+            s.bulk_insert_mappings(CompressionTask, mappings)
+            return len(mappings)
+
+    def get_tasks_by_job(self, job_id: int, status: str = None, session: Session = None) -> List[CompressionTask]:
         """Get all tasks for a specific job, optionally filtered by status"""
-        session = self.db_manager.get_session()
-        try:
-            query = session.query(CompressionTask).filter(CompressionTask.job_id == job_id)
+        with self._session(session) as s:
+            query = s.query(CompressionTask).filter(CompressionTask.job_id == job_id)
             if status:
                 query = query.filter(CompressionTask.status == status)
             return query.all()
-        finally:
-            session.close()
-    
-    def get_pending_tasks(self, job_id: int = None) -> List[CompressionTask]:
+
+    def get_pending_tasks(self, job_id: int = None, session: Session = None) -> List[CompressionTask]:
         """Get pending tasks, optionally for a specific job"""
-        session = self.db_manager.get_session()
-        try:
-            query = session.query(CompressionTask).filter(CompressionTask.status == 'pending')
+        with self._session(session) as s:
+            query = s.query(CompressionTask).filter(CompressionTask.status == 'pending')
             if job_id:
                 query = query.filter(CompressionTask.job_id == job_id)
             return query.all()
-        finally:
-            session.close()
-    
+
+    def mark_started(self, task_id: int, worker_id: str = None, session: Session = None) -> bool:
+        """Atomically claim a pending task: a single UPDATE guarded by
+        status='pending' stamps started_at server-side, so two workers can
+        never claim the same task"""
+        with self._session(session) as s:
+            result = s.execute(_claim_task_stmt,
+                               {'task_id': task_id, 'claimed_by': worker_id})
+            return result.rowcount > 0
+
+    def mark_finished(self, task_id: int, status: str = 'completed',
+                      session: Session = None) -> bool:
+        """Fast path for the plain completion transition: one precompiled
+        UPDATE stamping completed_at server-side. Use update_task_status
+        when output metadata also needs recording."""
+        with self._session(session) as s:
+            result = s.execute(_finish_task_stmt,
+                               {'task_id': task_id, 'new_status': status})
+            return result.rowcount > 0
+
     def update_task_status(self, task_id: int, status: str, worker_id: str = None,
                           output_filepath: str = None, output_size_mb: float = None,
-                          error_message: str = None, ffmpeg_command: str = None) -> bool:
+                          error_message: str = None, ffmpeg_command: str = None,
+                          session: Session = None) -> bool:
         """Update task status and related information"""
-        session = self.db_manager.get_session()
-        try:
-            task = session.query(CompressionTask).filter(CompressionTask.id == task_id).first()
+        with self._session(session) as s:
+            # Eager-load the parent video so the compression-ratio calculation
+            # below does not trigger a lazy SELECT per task update
+            task = s.query(CompressionTask)\
+                    .options(joinedload(CompressionTask.video))\
+                    .filter(CompressionTask.id == task_id).first()
             if task:
                 task.status = status
                 if worker_id:
@@ -247,37 +355,38 @@ class CompressionTaskService:
                     task.error_message = error_message
                 if ffmpeg_command:
                     task.ffmpeg_command = ffmpeg_command
-                
+
                 if status == 'processing' and not task.started_at:
-                    task.started_at = datetime.now()
+                    task.started_at = func.now()
                 elif status in ['completed', 'failed']:
-                    task.completed_at = datetime.now()
-                
+                    task.completed_at = func.now()
+
                 # Calculate compression ratio if we have the data
-                if (task.output_size_mb and task.video and 
+                if (task.output_size_mb and task.video and
                     task.video.original_size_mb and task.video.original_size_mb > 0):
                     task.compression_ratio = task.output_size_mb / task.video.original_size_mb
-                
-                session.commit()
+
                 return True
             return False
-        finally:
-            session.close()
-    
-    def get_task_statistics(self, job_id: int = None) -> Dict[str, Any]:
+
+    def get_task_statistics(self, job_id: int = None, session: Session = None) -> Dict[str, Any]:
         """Get task statistics for a job or globally"""
-        session = self.db_manager.get_session()
-        try:
-            query = session.query(CompressionTask)
+        with self._session(session) as s:
+            # One round-trip: total plus a conditional count per status
+            query = s.query(
+                func.count(),
+                func.sum(case((CompressionTask.status == 'completed', 1), else_=0)),
+                func.sum(case((CompressionTask.status == 'failed', 1), else_=0)),
+                func.sum(case((CompressionTask.status == 'processing', 1), else_=0)),
+                func.sum(case((CompressionTask.status == 'pending', 1), else_=0)),
+            )
             if job_id:
                 query = query.filter(CompressionTask.job_id == job_id)
-            
-            total_tasks = query.count()
-            completed_tasks = query.filter(CompressionTask.status == 'completed').count()
-            failed_tasks = query.filter(CompressionTask.status == 'failed').count()
-            processing_tasks = query.filter(CompressionTask.status == 'processing').count()
-            pending_tasks = query.filter(CompressionTask.status == 'pending').count()
-            
+
+            total_tasks, completed_tasks, failed_tasks, processing_tasks, pending_tasks = (
+                count or 0 for count in query.one()
+            )
+
             return {
                 'total_tasks': total_tasks,
                 'completed_tasks': completed_tasks,
@@ -286,20 +395,57 @@ class CompressionTaskService:
                 'pending_tasks': pending_tasks,
                 'success_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
             }
-        finally:
-            session.close()
 
-class SystemMetricsService:
+class SystemMetricsService(BaseService):
     """Service for managing system metrics"""
-    
-    def __init__(self):
-        self.db_manager = get_db_manager()
-    
+
+    # Flush buffered samples once either threshold is reached
+    METRICS_FLUSH_SIZE = 64
+    METRICS_FLUSH_SECONDS = 5.0
+
+    def __init__(self, db_manager=None):
+        super().__init__(db_manager)
+        self._buffer = deque()
+        self._buffer_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def buffer_metrics(self, job_id: int, cpu_percent: float, memory_percent: float,
+                       active_workers: int, pending_tasks: int = 0, completed_tasks: int = 0) -> None:
+        """Queue a metrics sample; samples are written in one bulk INSERT per
+        batch instead of one ORM commit per sample."""
+        with self._buffer_lock:
+            self._buffer.append({
+                'job_id': job_id,
+                'cpu_percent': cpu_percent,
+                'memory_percent': memory_percent,
+                'active_workers': active_workers,
+                'pending_tasks': pending_tasks,
+                'completed_tasks': completed_tasks,
+            })
+            should_flush = (len(self._buffer) >= self.METRICS_FLUSH_SIZE or
+                            time.monotonic() - self._last_flush >= self.METRICS_FLUSH_SECONDS)
+            rows = None
+            if should_flush:
+                rows = list(self._buffer)
+                self._buffer.clear()
+                self._last_flush = time.monotonic()
+        if rows:
+            self.db_manager.copy_metrics(rows)
+
+    def flush_metrics(self) -> None:
+        """Write out any buffered samples immediately."""
+        with self._buffer_lock:
+            rows = list(self._buffer)
+            self._buffer.clear()
+            self._last_flush = time.monotonic()
+        if rows:
+            self.db_manager.copy_metrics(rows)
+
     def record_metrics(self, job_id: int, cpu_percent: float, memory_percent: float,
-                      active_workers: int, pending_tasks: int = 0, completed_tasks: int = 0) -> SystemMetrics:
+                      active_workers: int, pending_tasks: int = 0, completed_tasks: int = 0,
+                      session: Session = None) -> SystemMetrics:
         """Record system metrics for a job"""
-        session = self.db_manager.get_session()
-        try:
+        with self._session(session) as s:
             metrics = SystemMetrics(
                 job_id=job_id,
                 cpu_percent=cpu_percent,
@@ -308,111 +454,162 @@ class SystemMetricsService:
                 pending_tasks=pending_tasks,
                 completed_tasks=completed_tasks
             )
-            session.add(metrics)
-            session.commit()
-            session.refresh(metrics)
+            s.add(metrics)
+            s.flush()
             return metrics
-        finally:
-            session.close()
-    
-    def get_metrics_by_job(self, job_id: int, limit: int = 100) -> List[SystemMetrics]:
+
+    def get_metrics_by_job(self, job_id: int, limit: int = 100, session: Session = None) -> List[SystemMetrics]:
         """Get system metrics for a specific job"""
-        session = self.db_manager.get_session()
-        try:
-            return session.query(SystemMetrics)\
-                         .filter(SystemMetrics.job_id == job_id)\
-                         .order_by(desc(SystemMetrics.timestamp))\
-                         .limit(limit)\
-                         .all()
-        finally:
-            session.close()
-    
-    def get_average_metrics_by_job(self, job_id: int) -> Dict[str, float]:
+        with self._session(session) as s:
+            return s.query(SystemMetrics)\
+                    .filter(SystemMetrics.job_id == job_id)\
+                    .order_by(desc(SystemMetrics.timestamp))\
+                    .limit(limit)\
+                    .all()
+
+    def get_average_metrics_by_job(self, job_id: int, session: Session = None) -> Dict[str, float]:
         """Get average system metrics for a job"""
-        session = self.db_manager.get_session()
-        try:
-            result = session.query(
+        with self._session(session) as s:
+            result = s.query(
                 func.avg(SystemMetrics.cpu_percent).label('avg_cpu'),
                 func.avg(SystemMetrics.memory_percent).label('avg_memory'),
                 func.avg(SystemMetrics.active_workers).label('avg_workers'),
                 func.max(SystemMetrics.active_workers).label('max_workers')
             ).filter(SystemMetrics.job_id == job_id).first()
-            
+
             return {
                 'average_cpu_percent': round(result.avg_cpu or 0, 2),
                 'average_memory_percent': round(result.avg_memory or 0, 2),
                 'average_workers': round(result.avg_workers or 0, 2),
                 'max_workers': result.max_workers or 0
             }
-        finally:
-            session.close()
 
 class CRUDService:
-    """Main CRUD service that combines all services"""
-    
-    def __init__(self):
-        self.jobs = CompressionJobService()
-        self.videos = VideoFileService()
-        self.tasks = CompressionTaskService()
-        self.metrics = SystemMetricsService()
-        self.db_manager = get_db_manager()
-    
+    """Main CRUD service that combines all services.
+
+    Child services are created lazily so constructing the facade does not
+    resolve the database manager until something is actually used (and tests
+    can swap sub-services in before first access).
+    """
+
+    def __init__(self, db_manager=None):
+        # When a configured manager is passed in, every child service shares
+        # its engine and connection pool
+        self._db_manager = db_manager
+
+    @cached_property
+    def jobs(self) -> CompressionJobService:
+        return CompressionJobService(self._db_manager)
+
+    @cached_property
+    def videos(self) -> VideoFileService:
+        return VideoFileService(self._db_manager)
+
+    @cached_property
+    def tasks(self) -> CompressionTaskService:
+        return CompressionTaskService(self._db_manager)
+
+    @cached_property
+    def metrics(self) -> SystemMetricsService:
+        return SystemMetricsService(self._db_manager)
+
+    @cached_property
+    def db_manager(self):
+        return self._db_manager or get_db_manager()
+
     def initialize_database(self) -> bool:
         """Initialize the database with all tables"""
         return self.db_manager.initialize()
-    
+
     def create_compression_batch(self, job_name: str, input_folder: str, output_folder: str,
-                                video_files: List[str], quality_profiles: List[tuple],
-                                dolby_atmos_enabled: bool = True) -> Optional[CompressionJob]:
-        """Create a complete compression batch with job, videos, and tasks"""
+                                video_files: List[str], quality_profiles: List[Any],
+                                dolby_atmos_enabled: bool = True,
+                                video_infos: Dict[str, Any] = None) -> Optional[CompressionJob]:
+        """Create a complete compression batch with job, videos, and tasks.
+
+        quality_profiles is a list of Quality objects (bitrate/resolution/hdr).
+        video_infos maps filepath to already-probed metadata (the dict shape
+        probe_video returns); files it doesn't cover are probed here, so
+        callers that batch-probed up front pay no second ffprobe per file.
+        """
         try:
-            # Create the job
-            job = self.jobs.create_job(job_name, input_folder, output_folder, dolby_atmos_enabled)
-            
-            total_tasks = 0
-            
-            # Create video records and tasks
-            for video_file in video_files:
-                # Get video info (you can extend this to get actual file info)
-                video = self.videos.create_video(
-                    job_id=job.id,
-                    filename=os.path.basename(video_file),
-                    filepath=video_file
+            # Run the whole batch - job, videos, tasks, totals - in one
+            # transaction instead of one commit per row
+            with self.jobs._session() as session:
+                job = self.jobs.create_job(job_name, input_folder, output_folder,
+                                           dolby_atmos_enabled, session=session)
+
+                # Persist each file's metadata on ingest, so later jobs can
+                # read it from the VideoFile row instead of re-running ffprobe
+                video_rows = []
+                for video_file in video_files:
+                    probe = (video_infos or {}).get(video_file)
+                    if probe is None:
+                        probe = probe_video(video_file) or {}
+                    video_rows.append({
+                        'job_id': job.id,
+                        'filename': os.path.basename(video_file),
+                        'filepath': video_file,
+                        'original_size_mb': probe.get('size_mb'),
+                        'original_width': probe.get('width'),
+                        'original_height': probe.get('height'),
+                        'duration_seconds': probe.get('duration_seconds'),
+                        'is_portrait': probe.get('is_portrait', False),
+                        'status': 'pending',
+                    })
+
+                if video_rows:
+                    session.execute(insert(VideoFile), video_rows)
+
+                # Map the inserted videos back to their ids for the task rows
+                video_ids = dict(
+                    session.query(VideoFile.filepath, VideoFile.id)
+                           .filter(VideoFile.job_id == job.id)
+                           .all()
                 )
-                
-                # Create tasks for each quality profile
-                for bitrate, resolution, hdr_metadata in quality_profiles:
-                    quality_profile = f"{resolution}_{bitrate}"
-                    self.tasks.create_task(
-                        job_id=job.id,
-                        video_id=video.id,
-                        quality_profile=quality_profile,
-                        bitrate=bitrate,
-                        resolution=resolution,
-                        hdr_metadata=hdr_metadata
-                    )
-                    total_tasks += 1
-            
-            # Update job with total tasks
-            self.jobs.update_job_progress(job.id, total_tasks=total_tasks)
-            
+
+                task_rows = []
+                for video_file in video_files:
+                    video_id = video_ids.get(video_file)
+                    if video_id is None:
+                        continue
+                    for quality in quality_profiles:
+                        task_rows.append({
+                            'job_id': job.id,
+                            'video_id': video_id,
+                            'quality_profile': f"{quality.resolution}_{quality.bitrate}",
+                            'bitrate': quality.bitrate,
+                            'resolution': quality.resolution,
+                            'hdr_metadata': quality.hdr,
+                            'status': 'pending',
+                        })
+
+                if task_rows:
+                    session.execute(insert(CompressionTask), task_rows)
+
+                # Update job with total tasks
+                self.jobs.update_job_progress(job.id, total_tasks=len(task_rows),
+                                              session=session)
+
             return job
-            
+
         except Exception as e:
             print(f"Error creating compression batch: {e}")
             return None
-    
+
     def get_dashboard_data(self) -> Dict[str, Any]:
         """Get dashboard data with overall statistics"""
         try:
             all_jobs = self.jobs.get_all_jobs(limit=10)
             active_jobs = self.jobs.get_jobs_by_status('processing')
-            
-            # Overall statistics
-            total_jobs = len(self.jobs.get_all_jobs(limit=1000))  # Simple count
-            completed_jobs = len(self.jobs.get_jobs_by_status('completed'))
-            failed_jobs = len(self.jobs.get_jobs_by_status('failed'))
-            
+
+            # Overall statistics from one grouped COUNT query instead of
+            # hydrating every job row just to take len()
+            status_counts = self.jobs.get_status_counts()
+            total_jobs = sum(status_counts.values())
+            completed_jobs = status_counts.get('completed', 0)
+            failed_jobs = status_counts.get('failed', 0)
+
             return {
                 'recent_jobs': all_jobs,
                 'active_jobs': active_jobs,
@@ -425,12 +622,7 @@ class CRUDService:
             print(f"Error getting dashboard data: {e}")
             return {}
 
-# Global CRUD service instance
-crud_service = None
-
-def get_crud_service():
+@cache
+def get_crud_service() -> CRUDService:
     """Get the global CRUD service instance"""
-    global crud_service
-    if crud_service is None:
-        crud_service = CRUDService()
-    return crud_service 
\ No newline at end of file
+    return CRUDService()
@@ -1,27 +1,128 @@
 """
 Database models for Lambrk Video Compressor
 """
+import csv
 import datetime
+import io
 import os
+import re
 import sys
+import threading
+import time
+from functools import lru_cache
 from typing import Optional, Dict, Any
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, text
+import importlib.util
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, Text, ForeignKey, JSON, text, Index, insert, select, Enum, event
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.exc import OperationalError, ProgrammingError
 
+# Async sessions need the asyncpg driver, which is optional
+try:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    import asyncpg  # noqa: F401 - presence check only
+    ASYNC_ENABLED = True
+except ImportError:
+    ASYNC_ENABLED = False
+
+__all__ = [
+    'Base', 'TaskStatus',
+    'CompressionJob', 'VideoFile', 'CompressionTask', 'SystemMetrics',
+    'DatabaseManager', 'get_db_manager', 'initialize_database',
+    'reset_db_manager', 'init_database',
+]
+
 Base = declarative_base()
 
+# Lifecycle states shared by jobs, videos and tasks. Stored as a native
+# PostgreSQL enum (1-4 bytes per row instead of a full VARCHAR, and
+# fixed-width index entries); other backends fall back to VARCHAR + CHECK.
+TaskStatus = Enum('pending', 'processing', 'completed', 'failed', 'cancelled',
+                  name='task_status', native_enum=True)
+
+# UI polling reads job progress many times per second; cache the aggregate
+# for a short TTL instead of hitting the database per access
+METRICS_CACHE_ENABLED = os.getenv('METRICS_CACHE_ENABLED', 'true').lower() != 'false'
+
+# Opt-in monthly range partitioning for system_metrics (PostgreSQL only).
+# Off by default because create_all can't convert an existing plain table;
+# enable on fresh installs that expect weeks of sustained metrics ingest.
+METRICS_PARTITIONED = os.getenv('METRICS_PARTITIONED', 'false').lower() == 'true'
+
+class _TTLCache:
+    """Tiny thread-safe TTL cache for per-job progress reads"""
+
+    def __init__(self, ttl: float = 1.0):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Any] = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() < entry[1]:
+                return entry[0]
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+# Engines are expensive to build (dialect first-connect probes, a fresh
+# connection pool); memoize them per URL so repeated manager construction
+# and the admin connection in create_database_if_not_exists reuse pools.
+_cached_engines = []
+
+@lru_cache(maxsize=8)
+def _engine_for(url: str, kwargs_key: tuple = ()):
+    """Return a (cached) engine for a URL; kwargs_key is a hashable
+    tuple of create_engine keyword items"""
+    engine = create_engine(url, **dict(kwargs_key))
+    _cached_engines.append(engine)
+    return engine
+
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """Tune a fresh SQLite connection for the compressor's write pattern"""
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.close()
+
+def _dispose_cached_engines():
+    """Dispose and forget every memoized engine (test teardown)"""
+    for engine in _cached_engines:
+        engine.dispose()
+    _cached_engines.clear()
+    _engine_for.cache_clear()
+
 class CompressionJob(Base):
     """Model for tracking video compression jobs"""
     __tablename__ = 'compression_jobs'
-    
+    __table_args__ = (
+        # get_jobs_by_status filters by status and orders by created_at DESC
+        Index('ix_job_status_created', 'status', text('created_at DESC')),
+        # Nearly all rows end up completed; a partial index keeps the
+        # pending/processing polling queries on a tiny working-set index
+        Index('idx_jobs_active', 'id',
+              postgresql_where=text("status IN ('pending', 'processing')")),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_name = Column(String(255), nullable=False)
     input_folder = Column(String(500), nullable=False)
     output_folder = Column(String(500), nullable=False)
-    status = Column(String(50), default='pending')  # pending, processing, completed, failed, cancelled
+    status = Column(TaskStatus, default='pending', nullable=False)  # pending, processing, completed, failed, cancelled
     created_at = Column(DateTime, default=func.now())
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
@@ -34,10 +135,14 @@ class CompressionJob(Base):
     dolby_atmos_enabled = Column(Boolean, default=True)
     error_message = Column(Text, nullable=True)
     
-    # Relationships
-    videos = relationship("VideoFile", back_populates="job")
-    tasks = relationship("CompressionTask", back_populates="job")
-    metrics = relationship("SystemMetrics", back_populates="job")
+    # Relationships. Children carry a NOT NULL job_id, so deleting a job must
+    # delete its rows rather than null the FK out from under them.
+    videos = relationship("VideoFile", back_populates="job",
+                          cascade="all, delete-orphan")
+    tasks = relationship("CompressionTask", back_populates="job",
+                         cascade="all, delete-orphan")
+    metrics = relationship("SystemMetrics", back_populates="job",
+                           cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<CompressionJob(id={self.id}, name='{self.job_name}', status='{self.status}')>"
@@ -57,7 +162,14 @@ class CompressionJob(Base):
 class VideoFile(Base):
     """Model for tracking individual video files"""
     __tablename__ = 'video_files'
-    
+    __table_args__ = (
+        # "which videos in job X are still pending?" polling path
+        Index('ix_video_job_status', 'job_id', 'status'),
+        # Partial index over the small active working set (see idx_jobs_active)
+        Index('idx_videos_active', 'job_id',
+              postgresql_where=text("status IN ('pending', 'processing')")),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(Integer, ForeignKey('compression_jobs.id'), nullable=False)
     filename = Column(String(500), nullable=False)
@@ -67,13 +179,14 @@ class VideoFile(Base):
     original_height = Column(Integer, nullable=True)
     duration_seconds = Column(Float, nullable=True)
     is_portrait = Column(Boolean, default=False)
-    status = Column(String(50), default='pending')  # pending, processing, completed, failed
+    status = Column(TaskStatus, default='pending', nullable=False)  # pending, processing, completed, failed
     processed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     
     # Relationships
     job = relationship("CompressionJob", back_populates="videos")
-    tasks = relationship("CompressionTask", back_populates="video")
+    tasks = relationship("CompressionTask", back_populates="video",
+                         cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<VideoFile(id={self.id}, filename='{self.filename}', status='{self.status}')>"
@@ -81,15 +194,29 @@ class VideoFile(Base):
 class CompressionTask(Base):
     """Model for tracking individual compression tasks (video + quality combination)"""
     __tablename__ = 'compression_tasks'
-    
+    __table_args__ = (
+        # get_tasks_by_job / get_pending_tasks filter by (job_id, status)
+        Index('ix_task_job_status', 'job_id', 'status'),
+        # Per-video rendition polling filters by (video_id, status)
+        Index('ix_task_video_status', 'video_id', 'status'),
+        # GIN index so HDR-metadata containment lookups (@>) avoid a
+        # full table scan; other backends ignore the postgresql_ kwarg
+        Index('idx_task_hdr_meta', 'hdr_metadata', postgresql_using='gin'),
+        # Partial index over the small active working set (see idx_jobs_active)
+        Index('idx_tasks_active', 'job_id',
+              postgresql_where=text("status IN ('pending', 'processing')")),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(Integer, ForeignKey('compression_jobs.id'), nullable=False)
     video_id = Column(Integer, ForeignKey('video_files.id'), nullable=False)
     quality_profile = Column(String(100), nullable=False)  # e.g., "1920x1080_2000k"
     bitrate = Column(String(20), nullable=False)
     resolution = Column(String(20), nullable=False)
-    hdr_metadata = Column(JSON, nullable=True)
-    status = Column(String(50), default='pending')  # pending, processing, completed, failed
+    # JSONB on PostgreSQL (binary storage, ~2x faster reads, indexable);
+    # plain JSON everywhere else
+    hdr_metadata = Column(JSON().with_variant(JSONB(), 'postgresql'), nullable=True)
+    status = Column(TaskStatus, default='pending', nullable=False)  # pending, processing, completed, failed
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
     output_filepath = Column(String(1000), nullable=True)
@@ -115,10 +242,20 @@ class CompressionTask(Base):
 class SystemMetrics(Base):
     """Model for tracking system resource usage during compression"""
     __tablename__ = 'system_metrics'
-    
+    __table_args__ = (
+        # get_metrics_by_job filters by job_id and orders by timestamp DESC;
+        # INCLUDE makes the chart columns available from the index alone so
+        # dashboard time-range reads become index-only scans (PostgreSQL 11+,
+        # ignored elsewhere)
+        Index('ix_metrics_job_ts', 'job_id', text('timestamp DESC'),
+              postgresql_include=['cpu_percent', 'memory_percent', 'active_workers']),
+    ) + (({'postgresql_partition_by': 'RANGE (timestamp)'},)
+         if METRICS_PARTITIONED else ())
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     job_id = Column(Integer, ForeignKey('compression_jobs.id'), nullable=True)
-    timestamp = Column(DateTime, default=func.now())
+    # When partitioned, the partition key must be part of the primary key
+    timestamp = Column(DateTime, default=func.now(), primary_key=METRICS_PARTITIONED)
     cpu_percent = Column(Float, nullable=False)
     memory_percent = Column(Float, nullable=False)
     active_workers = Column(Integer, nullable=False)
@@ -137,20 +274,30 @@ class DatabaseManager:
     Handles all database connections, setup, initialization, and configuration in one place
     """
     
-    def __init__(self, database_url: Optional[str] = None, 
+    def __init__(self, database_url: Optional[str] = None,
                  host: Optional[str] = None, port: Optional[str] = None,
                  user: Optional[str] = None, password: Optional[str] = None,
-                 database: Optional[str] = None):
+                 database: Optional[str] = None,
+                 pool_size: int = 20, max_overflow: int = 40):
         """
         Initialize database manager with flexible configuration options
-        
+
         Args:
             database_url: Complete database URL (takes precedence if provided)
             host, port, user, password, database: Individual connection parameters
+            pool_size, max_overflow: Connection pool sizing; size this to the
+                expected number of concurrent compression workers
         """
         self.database_url = self._build_database_url(database_url, host, port, user, password, database)
+        # Parse once; handles passwords containing '@' or ':' correctly
+        self._url = make_url(self.database_url)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
         self.engine = None
         self.SessionLocal = None
+        self.async_engine = None
+        self.AsyncSessionLocal = None
+        self._progress_cache = _TTLCache(ttl=1.0)
         self._initialize_engine()
     
     def _build_database_url(self, database_url: Optional[str] = None,
@@ -168,6 +315,14 @@ class DatabaseManager:
         if env_url:
             return env_url
         
+        # Single-machine installs without psycopg2 (and without any explicit
+        # connection settings) run on a local SQLite file: no external server,
+        # no TCP round-trip per metrics/task write
+        explicit_config = any([host, port, user, password, database,
+                               os.getenv('DB_HOST'), os.getenv('DB_USER'), os.getenv('DB_NAME')])
+        if not explicit_config and importlib.util.find_spec('psycopg2') is None:
+            return 'sqlite:///lambrk.db'
+
         # Build from individual parameters or environment variables
         host = host or os.getenv('DB_HOST', 'localhost')
         port = port or os.getenv('DB_PORT', '5432')
@@ -180,7 +335,32 @@ class DatabaseManager:
     def _initialize_engine(self):
         """Initialize SQLAlchemy engine and session factory"""
         try:
-            self.engine = create_engine(self.database_url, echo=False)
+            engine_kwargs = {
+                'echo': False,
+                'future': True,
+                # Amortize statement compilation across the repeated
+                # task/metrics INSERTs and polling SELECTs
+                'query_cache_size': 1200,
+            }
+            if self.database_url.startswith('postgresql'):
+                # psycopg2 fast-execution helpers collapse executemany calls
+                # into batched VALUES statements
+                engine_kwargs['executemany_mode'] = 'values_plus_batch'
+                # Size the pool for concurrent compression workers plus the
+                # UI polling thread; pre-ping recovers connections that went
+                # stale while ffmpeg kept a session idle for minutes
+                engine_kwargs.update(
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_pre_ping=True,
+                    pool_recycle=1800,
+                    pool_timeout=5,
+                )
+            self.engine = _engine_for(self.database_url, tuple(sorted(engine_kwargs.items())))
+            if self.database_url.startswith('sqlite'):
+                # WAL lets readers run while a worker writes; NORMAL syncing
+                # skips the per-commit fsync that dominates small metric writes
+                event.listen(self.engine, 'connect', _set_sqlite_pragmas)
             self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
         except Exception as e:
             print(f"❌ Error initializing database engine: {e}")
@@ -198,26 +378,35 @@ class DatabaseManager:
     
     def create_database_if_not_exists(self) -> bool:
         """Create the database if it doesn't exist (PostgreSQL only)"""
+        # SQLite creates its file on first connect; nothing to provision
+        if not self.database_url.startswith('postgresql'):
+            return True
         try:
-            # Extract database name from URL
-            database_name = self.database_url.split('/')[-1]
-            
-            # Connect to PostgreSQL server (not specific database)
-            postgres_url = self.database_url.replace(f"/{database_name}", "/postgres")
-            postgres_engine = create_engine(postgres_url)
-            
+            database_name = self._url.database
+
+            # CREATE DATABASE can't take a bind parameter, so validate the
+            # name as a plain identifier before interpolating it into DDL
+            if not database_name or not re.fullmatch(r'[A-Za-z_][A-Za-z0-9_]*', database_name):
+                print(f"❌ Invalid database name: {database_name!r}")
+                return False
+
+            # Connect to PostgreSQL server (not specific database); memoized
+            # so repeated setup calls reuse the admin connection pool
+            postgres_engine = _engine_for(
+                self._url.set(database='postgres').render_as_string(hide_password=False))
+
             with postgres_engine.connect() as conn:
-                # Check if database exists
-                result = conn.execute(text(f"SELECT 1 FROM pg_database WHERE datname = '{database_name}'"))
+                # Check if database exists (parameterized, never interpolated)
+                result = conn.execute(text("SELECT 1 FROM pg_database WHERE datname = :name"),
+                                      {'name': database_name})
                 if not result.fetchone():
                     # Create database
                     conn.execute(text("COMMIT"))  # End any existing transaction
-                    conn.execute(text(f"CREATE DATABASE {database_name}"))
+                    conn.execute(text(f'CREATE DATABASE "{database_name}"'))
                     print(f"✅ Database '{database_name}' created successfully!")
                 else:
                     print(f"✅ Database '{database_name}' already exists")
-            
-            postgres_engine.dispose()
+
             return True
             
         except Exception as e:
@@ -227,52 +416,207 @@ class DatabaseManager:
     def create_tables(self) -> bool:
         """Create all database tables if they don't exist"""
         try:
-            # Check which tables already exist
-            existing_tables = set()
-            with self.engine.connect() as conn:
-                try:
-                    # Get list of existing tables
-                    result = conn.execute(text("""
-                        SELECT table_name 
-                        FROM information_schema.tables 
-                        WHERE table_schema = 'public'
-                    """))
-                    existing_tables = {row[0] for row in result}
-                except Exception as e:
-                    print(f"⚠️ Could not query existing tables: {e}")
-            
-            # Get all table names that should exist
-            expected_tables = {table.name for table in Base.metadata.tables.values()}
-            
-            # Determine which tables need to be created
-            tables_to_create = expected_tables - existing_tables
-            
-            if existing_tables & expected_tables:
-                print(f"✅ Found existing tables: {', '.join(existing_tables & expected_tables)}")
-            
-            if tables_to_create:
-                print(f"🔄 Creating new tables: {', '.join(tables_to_create)}")
-            else:
-                print("✅ All required tables already exist")
-            
-            # Create all tables (SQLAlchemy's create_all only creates missing tables)
-            Base.metadata.create_all(bind=self.engine)
-            
-            if tables_to_create:
-                print("✅ New database tables created successfully!")
-            else:
-                print("✅ Database tables verification completed!")
-            
+            # create_all already checks table existence per connection
+            # (checkfirst=True), so no separate information_schema query
+            Base.metadata.create_all(bind=self.engine, checkfirst=True)
+            self.ensure_metrics_partitions()
+            print("✅ Database tables verified/created successfully!")
             return True
         except Exception as e:
             print(f"❌ Error creating database tables: {e}")
             return False
     
+    def get_job_progress(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Get progress_percentage and duration_seconds for a job.
+
+        Results are cached for ~1s (disable with METRICS_CACHE_ENABLED=false)
+        so the UI poll loop doesn't issue a SELECT per read.
+        """
+        if METRICS_CACHE_ENABLED:
+            cached = self._progress_cache.get(job_id)
+            if cached is not None:
+                return cached
+
+        # Core select over the mapped columns (not raw text()) so the DateTime
+        # values come back coerced on every backend; SQLite stores them as
+        # strings and would otherwise break the duration subtraction below
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                select(CompressionJob.completed_tasks, CompressionJob.total_tasks,
+                       CompressionJob.started_at, CompressionJob.completed_at)
+                .where(CompressionJob.id == job_id)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        completed_tasks, total_tasks, started_at, completed_at = row
+        result = {
+            'progress_percentage': (completed_tasks / total_tasks * 100) if total_tasks else 0,
+            'duration_seconds': ((completed_at - started_at).total_seconds()
+                                 if started_at and completed_at else None),
+        }
+        if METRICS_CACHE_ENABLED:
+            self._progress_cache.put(job_id, result)
+        return result
+
+    def get_active_job_progress(self) -> Dict[int, float]:
+        """Get progress percentage for every processing job in one query.
+
+        Replaces the per-job progress_percentage reads in poll loops (an N+1
+        pattern) with a single GROUP BY over the task table.
+        """
+        try:
+            with self.engine.connect() as conn:
+                rows = conn.execute(text(
+                    "SELECT job_id, "
+                    "SUM(CASE WHEN status = 'completed' THEN 1 ELSE 0 END) * 100.0 / COUNT(*) "
+                    "FROM compression_tasks "
+                    "WHERE job_id IN (SELECT id FROM compression_jobs WHERE status = 'processing') "
+                    "GROUP BY job_id"
+                )).fetchall()
+            return {job_id: float(progress or 0) for job_id, progress in rows}
+        except Exception as e:
+            print(f"❌ Error fetching active job progress: {e}")
+            return {}
+
+    def invalidate_job_progress(self, job_id: Optional[int] = None):
+        """Drop cached progress (call on task-completion writes)"""
+        self._progress_cache.invalidate(job_id)
+
+    def bulk_insert_metrics(self, rows) -> bool:
+        """Insert a batch of SystemMetrics rows with a single statement"""
+        if not rows:
+            return True
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(SystemMetrics.__table__), rows)
+            return True
+        except Exception as e:
+            print(f"❌ Error bulk-inserting metrics: {e}")
+            return False
+
+    def ensure_metrics_partitions(self, months_ahead: int = 1) -> bool:
+        """Create monthly system_metrics partitions for the current month plus
+        months_ahead. No-op unless METRICS_PARTITIONED on PostgreSQL.
+
+        Writes then land in a small current partition and retention becomes a
+        metadata-only DROP of old partitions instead of row-by-row deletes.
+        """
+        if not (METRICS_PARTITIONED and self.database_url.startswith('postgresql')):
+            return True
+        try:
+            start = datetime.date.today().replace(day=1)
+            with self.engine.begin() as conn:
+                for _ in range(months_ahead + 1):
+                    end = (start.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+                    conn.execute(text(
+                        f'CREATE TABLE IF NOT EXISTS system_metrics_{start:%Y%m} '
+                        f"PARTITION OF system_metrics "
+                        f"FOR VALUES FROM ('{start}') TO ('{end}')"))
+                    start = end
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not create metrics partitions: {e}")
+            return False
+
+    def drop_metrics_partitions_before(self, cutoff: datetime.date) -> int:
+        """Drop whole metrics partitions older than cutoff; returns the count
+        dropped. No-op unless METRICS_PARTITIONED on PostgreSQL."""
+        if not (METRICS_PARTITIONED and self.database_url.startswith('postgresql')):
+            return 0
+        dropped = 0
+        try:
+            with self.engine.begin() as conn:
+                rows = conn.execute(text(
+                    "SELECT tablename FROM pg_tables "
+                    "WHERE tablename LIKE 'system\\_metrics\\_______'")).fetchall()
+                for (name,) in rows:
+                    month = datetime.datetime.strptime(name[-6:], '%Y%m').date()
+                    if month < cutoff.replace(day=1):
+                        conn.execute(text(f'DROP TABLE {name}'))
+                        dropped += 1
+            return dropped
+        except Exception as e:
+            print(f"⚠️ Could not drop old metrics partitions: {e}")
+            return dropped
+
+    def copy_metrics(self, rows) -> bool:
+        """Bulk-load SystemMetrics rows via COPY FROM STDIN (PostgreSQL).
+
+        COPY bypasses SQL parsing and binding entirely, which makes it
+        5-10x faster than even a batched INSERT on wide batches. Other
+        backends fall back to bulk_insert_metrics.
+        """
+        if not rows:
+            return True
+        if not self.database_url.startswith('postgresql'):
+            return self.bulk_insert_metrics(rows)
+        try:
+            # COPY skips column defaults, so stamp the timestamp here
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            for row in rows:
+                writer.writerow([
+                    row.get('job_id'),
+                    row.get('timestamp') or datetime.datetime.now().isoformat(sep=' '),
+                    row['cpu_percent'],
+                    row['memory_percent'],
+                    row['active_workers'],
+                    row.get('pending_tasks', 0),
+                    row.get('completed_tasks', 0),
+                ])
+            buf.seek(0)
+
+            conn = self.engine.raw_connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.copy_expert(
+                        "COPY system_metrics (job_id, timestamp, cpu_percent, memory_percent, "
+                        "active_workers, pending_tasks, completed_tasks) FROM STDIN WITH CSV",
+                        buf)
+                conn.commit()
+            finally:
+                conn.close()
+            return True
+        except Exception as e:
+            print(f"❌ Error copying metrics: {e}")
+            return False
+
     def get_session(self):
         """Get a database session"""
         if not self.SessionLocal:
             raise RuntimeError("Database not initialized. Call initialize() first.")
         return self.SessionLocal()
+
+    def _ensure_async_engine(self) -> bool:
+        """Lazily build the asyncpg-backed engine used by polling loops"""
+        if self.async_engine is not None:
+            return True
+        if not ASYNC_ENABLED or not self.database_url.startswith('postgresql'):
+            return False
+        try:
+            self.async_engine = create_async_engine(
+                self.database_url.replace('postgresql://', 'postgresql+asyncpg://', 1),
+                pool_size=self.pool_size,
+                max_overflow=self.max_overflow,
+            )
+            self.AsyncSessionLocal = async_sessionmaker(self.async_engine, expire_on_commit=False)
+            return True
+        except Exception as e:
+            print(f"⚠️ Could not initialize async engine: {e}")
+            return False
+
+    def get_async_session(self):
+        """Get a new AsyncSession for concurrent polling SELECTs.
+
+        Every asyncio task must open its own session (async with
+        db.get_async_session() as s: ...); sharing one session across
+        asyncio.gather tasks is not safe.
+        """
+        if not self._ensure_async_engine():
+            raise RuntimeError("Async sessions need asyncpg and a PostgreSQL URL")
+        return self.AsyncSessionLocal()
     
     def initialize(self, create_database: bool = True, create_tables: bool = True) -> bool:
         """
@@ -308,18 +652,12 @@ class DatabaseManager:
     def create_env_file(self) -> bool:
         """Create .env file with current database configuration"""
         try:
-            # Parse URL to get components
-            url_parts = self.database_url.replace('postgresql://', '').split('@')
-            user_pass = url_parts[0].split(':')
-            host_port_db = url_parts[1].split('/')
-            host_port = host_port_db[0].split(':')
-            
-            user = user_pass[0]
-            password = user_pass[1] if len(user_pass) > 1 else ''
-            host = host_port[0]
-            port = host_port[1] if len(host_port) > 1 else '5432'
-            database = host_port_db[1] if len(host_port_db) > 1 else ''
-            
+            user = self._url.username or ''
+            password = self._url.password or ''
+            host = self._url.host or ''
+            port = str(self._url.port or 5432)
+            database = self._url.database or ''
+
             env_content = f"""# Lambrk Video Compressor Database Configuration
 DATABASE_URL={self.database_url}
 
@@ -343,17 +681,12 @@ DB_NAME={database}
     def get_connection_info(self) -> Dict[str, str]:
         """Get connection information for display"""
         try:
-            url_parts = self.database_url.replace('postgresql://', '').split('@')
-            user_pass = url_parts[0].split(':')
-            host_port_db = url_parts[1].split('/')
-            host_port = host_port_db[0].split(':')
-            
             return {
-                'user': user_pass[0],
-                'host': host_port[0],
-                'port': host_port[1] if len(host_port) > 1 else '5432',
-                'database': host_port_db[1] if len(host_port_db) > 1 else '',
-                'url_masked': f"postgresql://{user_pass[0]}:***@{host_port[0]}:{host_port[1] if len(host_port) > 1 else '5432'}/{host_port_db[1] if len(host_port_db) > 1 else ''}"
+                'user': self._url.username or '',
+                'host': self._url.host or '',
+                'port': str(self._url.port or 5432),
+                'database': self._url.database or '',
+                'url_masked': self._url.render_as_string(hide_password=True)
             }
         except:
             return {'error': 'Could not parse connection info'}
@@ -367,21 +700,24 @@ DB_NAME={database}
         """Legacy method name for backwards compatibility"""
         return self.initialize(create_database=True, create_tables=True)
 
-# Global database manager instance
-_db_manager: Optional[DatabaseManager] = None
+@lru_cache(maxsize=4)
+def _manager_for(database_url: Optional[str], extras_key: tuple) -> DatabaseManager:
+    """Build (and memoize) one DatabaseManager per distinct configuration"""
+    return DatabaseManager(database_url=database_url, **dict(extras_key))
 
 def get_db_manager(database_url: Optional[str] = None, **kwargs) -> DatabaseManager:
     """
-    Get the global database manager instance
-    
+    Get the shared database manager for a configuration
+
+    Memoized per (URL, parameters) rather than stored in a mutable global:
+    two threads racing on first access get the same instance instead of
+    each building a manager and pool.
+
     Args:
-        database_url: Database URL (only used on first call)
-        **kwargs: Additional connection parameters (only used on first call)
+        database_url: Database URL
+        **kwargs: Additional connection parameters
     """
-    global _db_manager
-    if _db_manager is None:
-        _db_manager = DatabaseManager(database_url=database_url, **kwargs)
-    return _db_manager
+    return _manager_for(database_url, tuple(sorted(kwargs.items())))
 
 def initialize_database(database_url: Optional[str] = None, **kwargs) -> bool:
     """
@@ -395,11 +731,9 @@ def initialize_database(database_url: Optional[str] = None, **kwargs) -> bool:
     return db_manager.initialize()
 
 def reset_db_manager():
-    """Reset the global database manager (useful for testing)"""
-    global _db_manager
-    if _db_manager:
-        _db_manager.close()
-    _db_manager = None
+    """Forget all cached managers and engines (useful for testing)"""
+    _manager_for.cache_clear()
+    _dispose_cached_engines()
 
 # Backwards compatibility functions
 def init_database():
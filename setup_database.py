@@ -3,8 +3,9 @@
 Database Setup Script for Lambrk Video Compressor
 Simple unified setup using the consolidated DatabaseManager
 """
+import importlib.util
 import sys
-from database_models import DatabaseManager, initialize_database
+from database_models import get_db_manager, initialize_database
 
 def interactive_setup():
     """Interactive database setup with user input"""
@@ -19,9 +20,10 @@ def interactive_setup():
     password = input("Password: ").strip() or "password"
     database = input("Database name (default: lambrk_compressor): ").strip() or "lambrk_compressor"
     
-    # Create database manager with user inputs
+    # Get the shared manager for this configuration so the CRUD test below
+    # reuses the same engine and connection pool
     try:
-        db_manager = DatabaseManager(
+        db_manager = get_db_manager(
             host=host,
             port=port,
             user=user,
@@ -82,13 +84,10 @@ def test_crud_operations(db_manager):
     """Test basic CRUD operations"""
     try:
         from crud_service import CRUDService
-        
-        # Reset global manager to use our configured one
-        from database_models import reset_db_manager
-        reset_db_manager()
-        
-        # Create CRUD service
-        crud = CRUDService()
+
+        # Bind the CRUD service to the configured manager so the test runs
+        # over the already-open connection pool
+        crud = CRUDService(db_manager)
         
         # Test creating a job
         job = crud.jobs.create_job(
@@ -123,10 +122,12 @@ def check_dependencies():
     missing_packages = []
     
     for package, pip_name in required_packages:
-        try:
-            __import__(package)
+        # find_spec checks installation without importing, so heavy packages
+        # don't get loaded (and their import side effects run) just to be
+        # reported as present
+        if importlib.util.find_spec(package) is not None:
             print(f"✅ {package} is installed")
-        except ImportError:
+        else:
             print(f"❌ {package} is missing")
             missing_packages.append(pip_name)
     
@@ -56,26 +56,18 @@ def test_sqlite_fallback():
         temp_db = tempfile.mktemp(suffix='.db')
         sqlite_url = f"sqlite:///{temp_db}"
         
-        from database_models import DatabaseManager
-        
-        # Test database creation
-        db_manager = DatabaseManager(sqlite_url)
+        from database_models import get_db_manager
+
+        # Test database creation; the memoized manager keeps one pooled
+        # engine for this URL instead of a new engine per test step
+        db_manager = get_db_manager(sqlite_url)
         if db_manager.init_database():
             print("✅ SQLite database created successfully!")
-            
-            # Test CRUD operations with our custom database manager
-            from crud_service import CompressionJobService, VideoFileService, CompressionTaskService, SystemMetricsService
-            
-            # Create services with our SQLite database manager
-            job_service = CompressionJobService()
-            job_service.db_manager = db_manager
-            
-            class TestCRUDService:
-                def __init__(self):
-                    self.jobs = job_service
-                    self.db_manager = db_manager
-            
-            crud = TestCRUDService()
+
+            # Test CRUD operations bound to our SQLite database manager
+            from crud_service import CRUDService
+
+            crud = CRUDService(db_manager)
             
             # Test job creation
             job = crud.jobs.create_job(
@@ -97,7 +89,33 @@ def test_sqlite_fallback():
                     updated_job = crud.jobs.get_job(job.id)
                     if updated_job.status == 'processing':
                         print("✅ Job status update successful!")
-                    
+
+                    # Test bulk task creation (one INSERT for all rows)
+                    video = crud.videos.create_video(job.id, "test.mp4", "/test/input/test.mp4")
+                    mappings = [{'job_id': job.id, 'video_id': video.id,
+                                 'quality_profile': f'profile_{i}', 'bitrate': '150k',
+                                 'resolution': '256x144', 'status': 'pending'}
+                                for i in range(100)]
+                    crud.tasks.create_tasks_bulk(mappings)
+                    tasks = crud.tasks.get_tasks_by_job(job.id)
+                    if len(tasks) == 100:
+                        print("✅ Bulk task insert successful!")
+
+                    # Test task claim/finish transitions: the first claim wins,
+                    # a second claim of the same task is a no-op
+                    task_id = tasks[0].id
+                    if (crud.tasks.mark_started(task_id, worker_id='worker-1')
+                            and not crud.tasks.mark_started(task_id, worker_id='worker-2')
+                            and crud.tasks.mark_finished(task_id, 'completed')):
+                        print("✅ Task claim/finish transitions successful!")
+
+                    # Test progress readout for a completed job: duration must
+                    # come from real datetimes even on SQLite
+                    crud.jobs.update_job_status(job.id, 'completed')
+                    progress = db_manager.get_job_progress(job.id)
+                    if progress and progress['duration_seconds'] is not None:
+                        print("✅ Completed job progress readout successful!")
+
                     # Test job deletion
                     if crud.jobs.delete_job(job.id):
                         print("✅ Job deletion successful!")
@@ -6,21 +6,31 @@ This script checks that all required dependencies are installed and working prop
 
 import sys
 import importlib
+import importlib.metadata
+import importlib.util
 
 def check_dependency(module_name, package_name=None, description=""):
     """Check if a dependency is available and working"""
     if package_name is None:
         package_name = module_name
-    
+
+    # find_spec answers "is it installed?" without importing, so the check
+    # doesn't pay each package's full import time and side effects
     try:
-        module = importlib.import_module(module_name)
-        version = getattr(module, '__version__', 'Unknown')
+        spec = importlib.util.find_spec(module_name)
+    except (ImportError, ValueError):
+        spec = None
+
+    if spec is not None:
+        try:
+            version = importlib.metadata.version(package_name)
+        except importlib.metadata.PackageNotFoundError:
+            version = 'Unknown'
         print(f"✅ {package_name:<20} {version:<15} - {description}")
         return True
-    except ImportError as e:
-        print(f"❌ {package_name:<20} {'MISSING':<15} - {description}")
-        print(f"   Error: {e}")
-        return False
+
+    print(f"❌ {package_name:<20} {'MISSING':<15} - {description}")
+    return False
 
 def check_builtin_modules():
     """Check built-in Python modules used by the application"""
@@ -35,7 +45,6 @@ def check_builtin_modules():
         ('json', 'json', 'JSON handling'),
         ('time', 'time', 'Time operations'),
         ('datetime', 'datetime', 'Date and time handling'),
-        ('random', 'random', 'Random number generation'),
         ('tempfile', 'tempfile', 'Temporary file creation'),
     ]
     
@@ -102,9 +111,11 @@ def generate_requirements_summary():
     """Generate a summary of current installed packages"""
     print("\n📋 Generating Requirements Summary:")
     try:
-        import pkg_resources
-        installed_packages = {pkg.project_name.lower(): pkg.version 
-                            for pkg in pkg_resources.working_set}
+        # importlib.metadata is stdlib; pkg_resources scans every installed
+        # distribution's metadata at import time and is deprecated
+        from importlib.metadata import distributions
+        installed_packages = {dist.metadata['Name'].lower(): dist.version
+                            for dist in distributions()}
         
         required_packages = [
             'psutil', 'psycopg2-binary', 'sqlalchemy', 'alembic', 
@@ -1,17 +1,19 @@
+import asyncio
 import os
 import json
-import random
 import tkinter as tk
 from tkinter import filedialog, scrolledtext, ttk, messagebox
+import shlex
 import subprocess
 import threading
 import time
 import psutil
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from queue import Queue, PriorityQueue
+from dataclasses import dataclass, field
+from functools import lru_cache
 import multiprocessing
 from datetime import datetime
-import shutil
 import hashlib
 
 # Database imports
@@ -23,8 +25,69 @@ except ImportError as e:
     print(f"Database modules not available: {e}")
     DATABASE_ENABLED = False
 
-input_directory = ""
-output_base_directory = ""
+# Optional fast JSON parser for ffprobe output
+try:
+    import orjson
+    ORJSON_ENABLED = True
+except ImportError:
+    ORJSON_ENABLED = False
+
+# Compared against lowercased suffixes, so .MP4/.MOV etc. match too
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv'}
+
+def _detect_videotoolbox():
+    """Checks once whether this ffmpeg build offers the VideoToolbox encoder.
+
+    On Linux, or a macOS build without VT, every hardcoded videotoolbox
+    invocation would fork ffmpeg just to fail during init; probing the
+    encoder list at import time lets the command builders fall back to
+    libx264 instead.
+    """
+    try:
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                capture_output=True, text=True)
+        return "hevc_videotoolbox" in result.stdout
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+VIDEOTOOLBOX_AVAILABLE = _detect_videotoolbox()
+
+@lru_cache(maxsize=64)
+def parse_resolution(resolution):
+    """Parses a 'WxH' string into an (int, int) tuple.
+
+    Memoized: the ladder only has a handful of distinct resolution strings
+    but they get parsed once per task in the scheduling and command-building
+    loops, so cache hits replace a split plus two int() calls.
+    """
+    width, height = resolution.split('x')
+    return int(width), int(height)
+
+@dataclass(slots=True, frozen=True)
+class Quality:
+    """One rung of the encoding ladder."""
+    bitrate: str
+    resolution: str
+    hdr: dict = field(default_factory=dict)
+
+# The encoding ladder. Landscape and portrait use the same rungs -- portrait
+# sources get their width recomputed per file from the aspect ratio at
+# compression time -- so one shared, immutable tuple serves both.
+QUALITY_LADDER = (
+    Quality("150k", "256x144"),
+    Quality("200k", "426x240"),
+    Quality("300k", "640x360"),
+    Quality("500k", "854x480"),
+    Quality("1000k", "1280x720"),
+    Quality("2000k", "1920x1080"),
+    Quality("4000k", "2560x1440"),
+    Quality("6000k", "3840x2160", {
+        "color_primaries": "bt2020",
+        "transfer_characteristics": "smpte2084",
+        "mastering_display_color_primaries": "bt2020",
+        "mastering_display_luminance": "1000"
+    }),
+)
 
 class AdvancedResourceMonitor:
     """Enhanced resource monitoring with intelligent scaling and memory management."""
@@ -45,10 +108,17 @@ class AdvancedResourceMonitor:
         
         # Memory per task estimation (in MB)
         self.estimated_memory_per_task = 500  # Conservative estimate
-        
+
+        # Prime the CPU counters so the first interval=None read below has a
+        # reference point instead of returning a meaningless 0.0
+        psutil.cpu_percent(interval=None)
+
     def get_system_usage(self):
         """Returns comprehensive system usage metrics."""
-        cpu_percent = psutil.cpu_percent(interval=0.5)  # Faster interval
+        # interval=None returns usage since the previous call from cached
+        # counters without sleeping, so callers on the Tk main thread (the
+        # periodic display update) no longer block for the sample window
+        cpu_percent = psutil.cpu_percent(interval=None)
         memory = psutil.virtual_memory()
         disk = psutil.disk_usage('/')
         
@@ -134,11 +204,12 @@ class AdvancedResourceMonitor:
 # Global resource monitor
 resource_monitor = AdvancedResourceMonitor()
 
-def analyze_video_complexity(input_file):
+def analyze_video_complexity(input_file, video_info=None):
     """Analyze video to determine processing complexity."""
     try:
-        video_info = get_video_info(input_file)
-        
+        if video_info is None:
+            video_info = get_video_info(input_file)
+
         # Get video properties
         video_stream = next((s for s in video_info['streams'] if s['codec_type'] == 'video'), None)
         if not video_stream:
@@ -162,10 +233,11 @@ def analyze_video_complexity(input_file):
         print(f"Error analyzing video complexity: {e}")
         return "medium"
 
-def should_skip_compression(input_file, target_resolution, target_bitrate):
+def should_skip_compression(input_file, target_resolution, target_bitrate, video_info=None):
     """Determine if compression should be skipped to avoid quality loss."""
     try:
-        video_info = get_video_info(input_file)
+        if video_info is None:
+            video_info = get_video_info(input_file)
         video_stream = next((s for s in video_info['streams'] if s['codec_type'] == 'video'), None)
         
         if not video_stream:
@@ -177,7 +249,7 @@ def should_skip_compression(input_file, target_resolution, target_bitrate):
         source_bitrate = int(video_info['format'].get('bit_rate', 0))
         
         # Parse target resolution
-        target_width, target_height = map(int, target_resolution.split('x'))
+        target_width, target_height = parse_resolution(target_resolution)
         target_bitrate_bps = int(target_bitrate.replace('k', '')) * 1000
         
         # Skip if target resolution is higher than source
@@ -203,28 +275,54 @@ def should_skip_compression(input_file, target_resolution, target_bitrate):
         print(f"Error checking if compression should be skipped: {e}")
         return False
 
-def get_optimized_ffmpeg_params(input_file, target_resolution, target_bitrate, hdr_metadata=None):
+def get_optimized_ffmpeg_params(input_file, target_resolution, target_bitrate, hdr_metadata=None, video_info=None, threads=None):
     """Generate optimized FFmpeg parameters based on input analysis."""
     try:
-        video_info = get_video_info(input_file)
+        if threads is None:
+            threads = min(4, multiprocessing.cpu_count())
+        if video_info is None:
+            video_info = get_video_info(input_file)
         video_stream = next((s for s in video_info['streams'] if s['codec_type'] == 'video'), None)
         
         if not video_stream:
             return None
         
         # Base parameters - optimized for quality and efficiency
+        # Each entry is an argv fragment so commands never go through a shell
+        target_width, target_height = parse_resolution(target_resolution)
+        if VIDEOTOOLBOX_AVAILABLE:
+            # hwaccel_output_format keeps decoded surfaces on the GPU, so
+            # decode -> scale -> encode never round-trips through CPU memory;
+            # scale_vt is the VT-native scaler operating on those surfaces
+            hwaccel = ['-hwaccel', 'videotoolbox', '-hwaccel_output_format', 'videotoolbox']
+            scale = ['-vf', f'scale_vt=w={target_width}:h={target_height}']
+            # hevc_videotoolbox gives ~30-40% smaller files than H.264 at the
+            # same quality; hvc1 (not hev1) is the tag Apple players require
+            codec = ['-c:v', 'hevc_videotoolbox', '-tag:v', 'hvc1', '-allow_sw', '1']
+        else:
+            # Software fallback: libx264 honours -preset, and the bitrate
+            # caps below still bound the output size
+            hwaccel = []
+            scale = ['-vf', f'scale={target_width}:{target_height}']
+            codec = ['-c:v', 'libx264', '-preset', 'fast']
+
         params = {
-            'hwaccel': '-hwaccel videotoolbox',
-            'input': f"'{input_file}'",
-            'scale': f'-vf scale={target_resolution}:flags=lanczos',  # Better scaling algorithm
-            'codec': '-c:v h264_videotoolbox',
-            'bitrate': f'-b:v {target_bitrate}',
-            'preset': '-preset fast',
-            'crf': '-crf 23',
-            'audio_codec': '-c:a aac -b:a 128k',  # Consistent audio quality
-            'format': '-f mp4',
-            'movflags': '-movflags +faststart',  # Better streaming compatibility
-            'threads': f'-threads {min(4, multiprocessing.cpu_count())}'  # Limit threads per task
+            'hwaccel': hwaccel,
+            'input': ['-i', input_file],
+            'scale': scale,
+            'codec': codec,
+            # VideoToolbox treats a bare -b:v loosely; maxrate/bufsize make
+            # the target an enforced cap rather than a suggestion
+            'bitrate': ['-b:v', target_bitrate, '-maxrate', target_bitrate,
+                        '-bufsize', f"{int(target_bitrate.rstrip('k')) * 2}k"],
+            'audio_codec': ['-c:a', 'aac', '-b:a', '128k'],  # Consistent audio quality
+            'format': ['-f', 'mp4'],
+            # No -pix_fmt: forcing nv12 would download frames off the GPU
+            'pix_fmt': [],
+            'movflags': ['-movflags', '+faststart'],  # Better streaming compatibility
+            # Sized by the caller to cpu_count // pool_width, so concurrent
+            # jobs don't oversubscribe cores with contending encoder threads
+            'threads': ['-threads', str(threads)]
         }
         
         # Advanced encoding parameters for better efficiency
@@ -239,17 +337,21 @@ def get_optimized_ffmpeg_params(input_file, target_resolution, target_bitrate, h
         
         # Optimize for frame rate - cap at 30fps for efficiency
         if source_fps > 30:
-            params['fps'] = '-r 30'
-        
+            params['fps'] = ['-r', '30']
+
         # HDR metadata handling
         if hdr_metadata and isinstance(hdr_metadata, dict):
             color_primaries = hdr_metadata.get('color_primaries', 'bt709')
             transfer_characteristics = hdr_metadata.get('transfer_characteristics', 'bt709')
-            
-            params['color_metadata'] = (
-                f'-metadata:s:v:0 color_primaries={color_primaries} '
-                f'-metadata:s:v:0 transfer_characteristics={transfer_characteristics}'
-            )
+
+            params['color_metadata'] = [
+                '-metadata:s:v:0', f'color_primaries={color_primaries}',
+                '-metadata:s:v:0', f'transfer_characteristics={transfer_characteristics}'
+            ]
+            # HDR needs 10-bit output; HEVC Main 10 carries it natively
+            # (the 8-bit libx264 fallback keeps its default profile)
+            if VIDEOTOOLBOX_AVAILABLE:
+                params['profile'] = ['-profile:v', 'main10']
         
         return params
         
@@ -257,49 +359,168 @@ def get_optimized_ffmpeg_params(input_file, target_resolution, target_bitrate, h
         print(f"Error generating optimized parameters: {e}")
         return None
 
-def get_video_info(input_file):
-    """Extracts video information using ffprobe."""
-    command = f"ffprobe -v quiet -print_format json -show_format -show_streams '{input_file}'"
-    output = os.popen(command).read()
-    return json.loads(output)
-
-def generate_random_hex():
-    """Generates a random 12-digit hexadecimal string."""
-    return ''.join(random.choices('0123456789abcdef', k=12))
-
-def create_output_directory(base_dir):
-    """Creates a new directory within the base directory with a random hex name."""
-    new_dir_name = generate_random_hex()
-    new_dir_path = os.path.join(base_dir, new_dir_name)
-
-    if not os.path.exists(new_dir_path):
-        os.makedirs(new_dir_path)
-        print(f"Created new directory: {new_dir_path}")
+# Fast-probe argument set: only the entries the pipeline actually reads, so
+# ffprobe can stop after the container header instead of parsing every stream.
+# probesize/analyzeduration cap how much payload it reads to work out stream
+# parameters -- for well-formed mp4/mov the header is enough
+_FAST_PROBE_ARGS = (
+    "-probesize", "1M", "-analyzeduration", "0",
+    "-select_streams", "v:0",
+    "-show_entries",
+    "stream=width,height,codec_name,codec_type,r_frame_rate,side_data_list:format=duration,size,bit_rate",
+)
+
+def _run_ffprobe(input_file, fast=False):
+    """Runs ffprobe and returns the parsed JSON output."""
+    if fast:
+        entry_args = list(_FAST_PROBE_ARGS)
     else:
-        print(f"Directory already exists: {new_dir_path}")
+        entry_args = ["-show_format", "-show_streams"]
+
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-print_format", "json"] + entry_args + [input_file],
+        capture_output=True, check=True
+    )
+    if ORJSON_ENABLED:
+        return orjson.loads(result.stdout)
+    return json.loads(result.stdout)
+
+@lru_cache(maxsize=256)
+def _cached_probe(input_file, _mtime_ns, _size):
+    """Probe implementation memoized per (path, mtime, size); the stat
+    fields key the cache so edited/replaced files are re-probed."""
+    # Fall back to an unbounded full probe if the capped fast path fails
+    # outright or comes back incomplete (e.g. moov atom past the 1M window)
+    try:
+        info = _run_ffprobe(input_file, fast=True)
+    except subprocess.CalledProcessError:
+        return _run_ffprobe(input_file)
+
+    streams = info.get('streams') or []
+    if not streams or 'width' not in streams[0] or 'duration' not in info.get('format', {}):
+        info = _run_ffprobe(input_file)
+    return info
+
+def get_video_info(input_file):
+    """Extracts video information using ffprobe.
+
+    Results are cached, so probing the same unchanged file from the
+    analysis, task-building, and compression paths costs one ffprobe run.
+    """
+    # Normalize so relative and absolute spellings of one file share an entry
+    input_file = os.path.abspath(input_file)
+    stat = os.stat(input_file)
+    return _cached_probe(input_file, stat.st_mtime_ns, stat.st_size)
+
+async def _probe_async(input_file, semaphore):
+    """Runs one capped fast probe under the concurrency semaphore."""
+    async with semaphore:
+        proc = await asyncio.create_subprocess_exec(
+            "ffprobe", "-v", "error", "-print_format", "json",
+            *_FAST_PROBE_ARGS, input_file,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        stdout, _ = await proc.communicate()
+    if proc.returncode != 0:
+        return None
+    if ORJSON_ENABLED:
+        return orjson.loads(stdout)
+    return json.loads(stdout)
+
+def probe_all(input_paths, limit=16):
+    """Probes a batch of files concurrently and returns {path: info or None}.
+
+    A single event loop drives every ffprobe via non-blocking pipes -- no
+    thread per file -- and the semaphore caps how many run at once so a big
+    folder doesn't fork hundreds of processes. Files the fast probe can't
+    handle are retried through the cached full-probe path; files that fail
+    both map to None.
+    """
+    async def runner():
+        semaphore = asyncio.Semaphore(limit)
+        return await asyncio.gather(
+            *(_probe_async(path, semaphore) for path in input_paths),
+            return_exceptions=True)
 
-    return new_dir_path
+    results = asyncio.run(runner())
+
+    infos = {}
+    for path, info in zip(input_paths, results):
+        if isinstance(info, Exception):
+            info = None
+        if info is not None:
+            streams = info.get('streams') or []
+            if not streams or 'width' not in streams[0] or 'duration' not in info.get('format', {}):
+                info = None
+        if info is None:
+            try:
+                info = get_video_info(path)
+            except Exception as e:
+                print(f"Error probing {path}: {e}")
+                info = None
+        infos[path] = info
+    return infos
+
+def video_file_metadata(input_path, info):
+    """Flattens an ffprobe info dict into the VideoFile metadata columns.
+
+    Lets batch creation persist the probe_all results instead of running a
+    second ffprobe per file on ingest. Returns None if the probe failed.
+    """
+    if not info:
+        return None
+    stream = info['streams'][0]
+    width = stream.get('width')
+    height = stream.get('height')
+    return {
+        'width': width,
+        'height': height,
+        'duration_seconds': float(info.get('format', {}).get('duration', 0) or 0),
+        'size_mb': os.path.getsize(input_path) / (1024 * 1024),
+        'is_portrait': bool(width and height and height > width),
+    }
+
+def output_directory_for(base_dir, input_path):
+    """Returns the per-source output directory, derived from the input path.
+
+    A hash of the absolute source path gives every run the same folder for
+    the same file, so a killed batch resumes into its existing outputs (the
+    per-rung exists checks then skip finished renditions) instead of
+    re-encoding everything into a fresh random directory.
+    """
+    digest = hashlib.blake2b(os.path.abspath(input_path).encode(), digest_size=6).hexdigest()
+    output_dir = os.path.join(base_dir, digest)
+    os.makedirs(output_dir, exist_ok=True)
+    return output_dir
 
 def is_portrait(width, height):
     """Checks if the video is in portrait orientation based on dimensions."""
     return height > width
 
-def compress_video_with_progress(input_file, output_dir, bitrate, resolution, hdr_metadata=None, dolby_atmos=False, progress_callback=None):
-    """Optimized video compression with intelligent quality preservation."""
+def compress_video_with_progress(input_file, output_dir, bitrate, resolution, hdr_metadata=None, dolby_atmos=False, progress_callback=None, video_info=None, threads=None):
+    """Optimized video compression with intelligent quality preservation.
+
+    Callers that already probed the file pass video_info through, so one
+    ffprobe result serves analysis, the skip check, and command building.
+    """
     try:
         # Pre-compression analysis
         if progress_callback:
             progress_callback(f"Analyzing: {os.path.basename(input_file)}")
-        
+
+        if video_info is None:
+            video_info = get_video_info(input_file)
+
         # Check if compression should be skipped
-        if should_skip_compression(input_file, resolution, bitrate):
+        if should_skip_compression(input_file, resolution, bitrate, video_info):
             if progress_callback:
                 progress_callback(f"⊝ Skipped: {os.path.basename(input_file)} -> {resolution} (quality preservation)")
             print(f"Skipping compression: target quality not beneficial for {input_file}")
             return True, None  # Return success but no output file
         
         # Extract video information
-        video_info = get_video_info(input_file)
         video_length = float(video_info['format']['duration'])
         original_width = video_info['streams'][0]['width']
         original_height = video_info['streams'][0]['height']
@@ -315,7 +536,7 @@ def compress_video_with_progress(input_file, output_dir, bitrate, resolution, hd
         # Intelligent resolution adjustment for portrait videos
         adjusted_resolution = resolution
         if is_portrait(original_width, original_height):
-            target_height = int(resolution.split('x')[1])
+            target_height = parse_resolution(resolution)[1]
             target_width = int(original_width * (target_height / original_height))
             # Ensure even dimensions for better encoding
             target_width = target_width - (target_width % 2)
@@ -332,48 +553,45 @@ def compress_video_with_progress(input_file, output_dir, bitrate, resolution, hd
             return True, output_file
 
         # Get optimized FFmpeg parameters
-        ffmpeg_params = get_optimized_ffmpeg_params(input_file, adjusted_resolution, bitrate, hdr_metadata)
+        ffmpeg_params = get_optimized_ffmpeg_params(input_file, adjusted_resolution, bitrate, hdr_metadata, video_info, threads)
         if not ffmpeg_params:
             raise Exception("Failed to generate FFmpeg parameters")
 
-        # Build optimized command
-        command_parts = [
-            "ffmpeg -y",  # Overwrite output files
-            ffmpeg_params['hwaccel'],
-            f"-i {ffmpeg_params['input']}",
-            ffmpeg_params['scale'],
-            ffmpeg_params['codec'],
-            ffmpeg_params['bitrate'],
-            ffmpeg_params['preset'],
-            ffmpeg_params['crf'],
-            ffmpeg_params['threads']
-        ]
-        
+        # Build optimized command as an argv list (no shell, no manual quoting)
+        command = ["ffmpeg", "-y"]  # Overwrite output files
+        command += ffmpeg_params['hwaccel']
+        command += ffmpeg_params['input']
+        command += ffmpeg_params['scale']
+        command += ffmpeg_params['codec']
+        command += ffmpeg_params['bitrate']
+        command += ffmpeg_params['threads']
+
+        # HDR sources get the 10-bit profile
+        if 'profile' in ffmpeg_params:
+            command += ffmpeg_params['profile']
+
         # Add frame rate limitation if needed
         if 'fps' in ffmpeg_params:
-            command_parts.append(ffmpeg_params['fps'])
-        
+            command += ffmpeg_params['fps']
+
         # Add color metadata if present
         if 'color_metadata' in ffmpeg_params:
-            command_parts.append(ffmpeg_params['color_metadata'])
-        
+            command += ffmpeg_params['color_metadata']
+
         # Audio codec selection
         if dolby_atmos:
-            command_parts.append("-c:a eac3 -b:a 256k")
+            command += ["-c:a", "eac3", "-b:a", "256k"]
         else:
-            command_parts.append(ffmpeg_params['audio_codec'])
-        
+            command += ffmpeg_params['audio_codec']
+
         # Add optimization flags
-        command_parts.extend([
-            ffmpeg_params['movflags'],
-            ffmpeg_params['format'],
-            f"'{output_file}'"
-        ])
-        
-        command = " ".join(command_parts)
+        command += ffmpeg_params['pix_fmt']
+        command += ffmpeg_params['movflags']
+        command += ffmpeg_params['format']
+        command.append(output_file)
 
         # Execute with timeout and resource monitoring
-        print(f"Executing optimized command: {command}")
+        print(f"Executing optimized command: {shlex.join(command)}")
         
         if progress_callback:
             progress_callback(f"Processing: {os.path.basename(input_file)} -> {adjusted_resolution}")
@@ -383,10 +601,10 @@ def compress_video_with_progress(input_file, output_dir, bitrate, resolution, hd
         
         try:
             result = subprocess.run(
-                command, 
-                shell=True, 
-                capture_output=True, 
-                text=True, 
+                command,
+                stdin=subprocess.DEVNULL,  # no interactive key handling
+                capture_output=True,
+                text=True,
                 timeout=timeout_seconds
             )
         except subprocess.TimeoutExpired:
@@ -437,11 +655,158 @@ def compress_video(input_file, output_dir, bitrate, resolution, hdr_metadata=Non
     success, output_file = compress_video_with_progress(input_file, output_dir, bitrate, resolution, hdr_metadata, dolby_atmos)
     return success
 
-def compress_videos_concurrent(input_dir, output_base_dir, landscape_qualities, portrait_qualities, dolby_atmos=False, progress_callback=None):
-    """Optimized concurrent video compression with intelligent task scheduling."""
+def rendition_target(input_file, quality, original_width, original_height):
+    """Returns (target_width, target_height, output_basename) for one rung.
+
+    Shared by the scheduler and the encoder so the pre-submit completion
+    check and the actual output file agree on the name, including the
+    portrait width adjustment.
+    """
+    target_width, target_height = parse_resolution(quality.resolution)
+    if is_portrait(original_width, original_height):
+        target_width = int(original_width * (target_height / original_height))
+        target_width -= target_width % 2
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return target_width, target_height, f"{base_name}_{target_width}x{target_height}.mp4"
+
+def compress_video_multi(input_file, output_dir, qualities, dolby_atmos=False, video_info=None, threads=None, progress_callback=None):
+    """Compresses one input into every quality rung with a single ffmpeg run.
+
+    The decoded stream is split once and fed through one GPU scaler and
+    encoder per rung, so the source is demuxed and decoded exactly once
+    instead of once per output. Returns a list of (output_file, success)
+    pairs; rungs that would upscale or already exist are left out.
+    Probe and planning failures propagate to the caller, which charges the
+    whole task as failed.
+    """
+    if video_info is None:
+        video_info = get_video_info(input_file)
+    original_width = video_info['streams'][0]['width']
+    original_height = video_info['streams'][0]['height']
+
+    # Work out which rungs still need producing before building the command
+    legs = []
+    for quality in qualities:
+        target_width, target_height = parse_resolution(quality.resolution)
+        # Never upscale: rungs larger than the source waste encoder time
+        if target_width > original_width and target_height > original_height:
+            continue
+        target_width, target_height, output_name = rendition_target(
+            input_file, quality, original_width, original_height)
+        output_file = os.path.join(output_dir, output_name)
+        if os.path.exists(output_file):
+            continue
+        legs.append((quality, target_width, target_height, output_file))
+
+    if not legs:
+        return []
+
+    # One split node fans the decoded frames out; with VideoToolbox the
+    # scale_vt chains keep every leg on GPU surfaces into its encoder
+    if VIDEOTOOLBOX_AVAILABLE:
+        hwaccel_opts = ["-hwaccel", "videotoolbox", "-hwaccel_output_format", "videotoolbox"]
+        scale_filter = "scale_vt=w={w}:h={h}"
+        codec_opts = ["-c:v", "hevc_videotoolbox", "-tag:v", "hvc1", "-allow_sw", "1"]
+    else:
+        hwaccel_opts = []
+        scale_filter = "scale={w}:{h}"
+        codec_opts = ["-c:v", "libx264", "-preset", "fast"]
+
+    split_labels = ''.join(f"[v{i}]" for i in range(len(legs)))
+    scale_chains = ';'.join("[v{i}]".format(i=i) + scale_filter.format(w=w, h=h) + f"[o{i}]"
+                            for i, (_, w, h, _) in enumerate(legs))
+    filter_graph = f"[0:v]split={len(legs)}{split_labels};{scale_chains}"
+
+    # -progress emits machine-readable key=value lines on stderr and
+    # -nostats drops the human status spam, so the drain below parses
+    # encode position without regexing the default progress line
+    command = (["ffmpeg", "-y", "-nostats", "-progress", "pipe:2"] + hwaccel_opts
+               + ["-i", input_file, "-filter_complex", filter_graph])
+    audio_opts = ["-c:a", "eac3", "-b:a", "256k"] if dolby_atmos else ["-c:a", "aac", "-b:a", "128k"]
+    for i, (quality, _, _, output_file) in enumerate(legs):
+        command += ["-map", f"[o{i}]", "-map", "0:a:0?"]
+        # maxrate/bufsize keep each rung on its ladder budget; a bare -b:v
+        # is only an average and lets complex scenes spike over the target
+        command += codec_opts + ["-b:v", quality.bitrate,
+                                 "-maxrate", quality.bitrate,
+                                 "-bufsize", f"{int(quality.bitrate.rstrip('k')) * 2}k"]
+        if quality.hdr:
+            if VIDEOTOOLBOX_AVAILABLE:
+                command += ["-profile:v", "main10"]
+            command += [
+                "-metadata:s:v:0", f"color_primaries={quality.hdr.get('color_primaries', 'bt709')}",
+                "-metadata:s:v:0", f"transfer_characteristics={quality.hdr.get('transfer_characteristics', 'bt709')}",
+            ]
+        if threads:
+            command += ["-threads", str(threads)]
+        command += audio_opts + ["-movflags", "+faststart", "-f", "mp4", output_file]
+
+    if progress_callback:
+        progress_callback(f"Processing: {os.path.basename(input_file)} ({len(legs)} renditions)")
+    print(f"Executing multi-output command: {shlex.join(command)}")
+
+    try:
+        # Drain stderr as it is produced instead of buffering all of it in
+        # memory until exit; only a short tail is kept for error reporting
+        duration = float(video_info.get('format', {}).get('duration', 0) or 0)
+        proc = subprocess.Popen(command, stdin=subprocess.DEVNULL,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                                text=True, bufsize=1)
+        stderr_tail = deque(maxlen=40)
+        last_percent = -5
+        for line in proc.stderr:
+            line = line.strip()
+            stderr_tail.append(line)
+            if duration > 0 and line.startswith('out_time_ms='):
+                try:
+                    out_time_us = int(line.split('=', 1)[1])  # microseconds
+                except ValueError:
+                    continue
+                percent = min(100, int(out_time_us / (duration * 10000)))
+                if progress_callback and percent >= last_percent + 5:
+                    last_percent = percent
+                    progress_callback(f"Encoding {os.path.basename(input_file)}: {percent}%")
+
+        success = proc.wait() == 0
+        if not success and stderr_tail:
+            print("FFmpeg error: " + "\n".join(stderr_tail))
+    except Exception as e:
+        # A failed launch (e.g. ffmpeg missing from PATH) must count every
+        # planned leg as failed, not return an empty list the scheduler
+        # would tally as "skipped"
+        print(f"Error compressing {input_file}: {str(e)}")
+        success = False
+    return [(output_file, success) for (_, _, _, output_file) in legs]
+
+# Stop handing the pool work above this memory level; matches the resource
+# monitor's critical threshold
+MEMORY_PRESSURE_THRESHOLD = 85
+
+def _wait_for_memory_headroom(threshold=MEMORY_PRESSURE_THRESHOLD, poll_interval=0.5):
+    """Blocks until system memory usage drops below the threshold.
+
+    The worker-count heuristics only react between completions; a 4K HDR
+    ladder can spike RSS in between and get the process OOM-killed. Polling
+    here applies backpressure at the submission boundary instead.
+    """
+    while psutil.virtual_memory().percent > threshold:
+        time.sleep(poll_interval)
+
+def compress_videos_concurrent(input_dir, output_base_dir, landscape_qualities, portrait_qualities, dolby_atmos=False, progress_callback=None, video_infos=None):
+    """Optimized concurrent video compression with intelligent task scheduling.
+
+    video_infos, when given, maps input path to an already-probed info dict
+    (as returned by probe_all) so callers that probed for batch creation
+    don't pay a second ffprobe pass here.
+    """
     print(f"Compressing videos in input directory: {input_dir}")
 
-    input_files = [f for f in os.listdir(input_dir) if f.endswith(('.mp4', '.MOV', '.mov', '.avi', '.mkv')) and not f.startswith('._')]
+    # scandir reuses the directory entry's cached type for is_file (no extra
+    # stat per name) and the lowercased suffix check also picks up .MP4/.MKV
+    with os.scandir(input_dir) as entries:
+        input_files = [e.name for e in entries
+                       if e.is_file() and not e.name.startswith('._')
+                       and os.path.splitext(e.name)[1].lower() in VIDEO_EXTENSIONS]
 
     if not input_files:
         print("No videos to compress")
@@ -449,12 +814,18 @@ def compress_videos_concurrent(input_dir, output_base_dir, landscape_qualities,
             progress_callback("No videos found to compress")
         return
 
+    # Probe all inputs concurrently before the encode loop starts; one event
+    # loop drives every ffprobe through non-blocking pipes (no thread per file)
+    input_paths = [os.path.join(input_dir, f) for f in input_files]
+    probed = video_infos if video_infos is not None else probe_all(input_paths)
+    video_infos = {f: probed.get(p) for f, p in zip(input_files, input_paths)}
+
     # Analyze all videos first for intelligent scheduling
     video_analysis = {}
     for input_file in input_files:
         input_path = os.path.join(input_dir, input_file)
         try:
-            complexity = analyze_video_complexity(input_path)
+            complexity = analyze_video_complexity(input_path, video_infos[input_file])
             file_size = os.path.getsize(input_path) / (1024 * 1024)  # MB
             video_analysis[input_file] = {
                 'complexity': complexity,
@@ -469,144 +840,168 @@ def compress_videos_concurrent(input_dir, output_base_dir, landscape_qualities,
                 'input_path': input_path
             }
 
-    # Create prioritized compression tasks
-    compression_tasks = []
-    task_priorities = []  # For priority queue
-    
+    # Group work per source file: every rung of a file comes out of one
+    # ffmpeg invocation via compress_video_multi's split graph, so the pool
+    # schedules videos (decode paid once per source), not renditions
+    file_tasks = []
+    pre_skipped = 0  # renditions finished by a previous run
     for input_file in input_files:
         analysis = video_analysis[input_file]
         input_path = analysis['input_path']
-        output_dir = create_output_directory(output_base_dir)
-        
-        try:
-            video_info = get_video_info(input_path)
-            original_width = video_info['streams'][0]['width']
-            original_height = video_info['streams'][0]['height']
-            
-            # Determine qualities based on orientation
-            if is_portrait(original_width, original_height):
-                qualities = portrait_qualities
-            else:
-                qualities = landscape_qualities
-            
-            # Create task for each quality with priority
-            for i, (bitrate, resolution, hdr) in enumerate(qualities):
-                # Calculate priority: lower complexity and smaller files first
-                complexity_weight = {'low': 1, 'medium': 2, 'high': 3, 'ultra': 4}
-                size_weight = min(4, int(analysis['file_size_mb'] / 100))  # Size in 100MB chunks
-                resolution_weight = i  # Process lower resolutions first
-                
-                priority = complexity_weight.get(analysis['complexity'], 2) + size_weight + resolution_weight
-                
-                task = {
-                    'input_path': input_path,
-                    'output_dir': output_dir,
-                    'bitrate': bitrate,
-                    'resolution': resolution,
-                    'hdr_metadata': hdr,
-                    'dolby_atmos': dolby_atmos,
-                    'task_id': f"{os.path.basename(input_file)}_{resolution}",
-                    'complexity': analysis['complexity'],
-                    'file_size_mb': analysis['file_size_mb'],
-                    'priority': priority
-                }
-                compression_tasks.append(task)
-                task_priorities.append((priority, len(compression_tasks) - 1))  # (priority, task_index)
-        
-        except Exception as e:
-            print(f"Error processing {input_file}: {e}")
+
+        video_info = video_infos[input_file]
+        if video_info is None:
+            print(f"Error processing {input_file}: probe failed")
             continue
-    
+        original_width = video_info['streams'][0]['width']
+        original_height = video_info['streams'][0]['height']
+
+        # Determine qualities based on orientation
+        if is_portrait(original_width, original_height):
+            qualities = portrait_qualities
+        else:
+            qualities = landscape_qualities
+
+        # Don't schedule upscales: a 480p source gets no 4K leg, so the
+        # progress totals reflect real work
+        scheduled = []
+        for quality in qualities:
+            target_width, target_height = parse_resolution(quality.resolution)
+            if target_width > original_width and target_height > original_height:
+                print(f"Skipping upscale {quality.resolution} for {input_file} "
+                      f"({original_width}x{original_height} source)")
+                continue
+            scheduled.append(quality)
+        if not scheduled:
+            print(f"Skipping {input_file}: every rung would upscale")
+            continue
+
+        # Drop rungs already completed by a previous run here, so fully
+        # finished files never reach the pool (no probe, command build, or
+        # ffmpeg launch just to discover the output exists)
+        output_dir = output_directory_for(output_base_dir, input_path)
+        remaining = []
+        for quality in scheduled:
+            _, _, output_name = rendition_target(input_path, quality, original_width, original_height)
+            output_path = os.path.join(output_dir, output_name)
+            if os.path.exists(output_path) and os.path.getsize(output_path) > 0:
+                pre_skipped += 1
+                continue
+            remaining.append(quality)
+        if not remaining:
+            print(f"Skipping {input_file}: all renditions already exist")
+            continue
+        scheduled = remaining
+
+        # Priority: lower complexity and smaller files first
+        complexity_weight = {'low': 1, 'medium': 2, 'high': 3, 'ultra': 4}
+        size_weight = min(4, int(analysis['file_size_mb'] / 100))  # Size in 100MB chunks
+
+        file_tasks.append({
+            'input_path': input_path,
+            'output_dir': output_dir,
+            'qualities': scheduled,
+            'video_info': video_info,
+            'task_id': os.path.basename(input_file),
+            'complexity': analysis['complexity'],
+            'file_size_mb': analysis['file_size_mb'],
+            'priority': complexity_weight.get(analysis['complexity'], 2) + size_weight,
+        })
+
     # Sort tasks by priority (lower number = higher priority)
-    task_priorities.sort(key=lambda x: x[0])
-    sorted_tasks = [compression_tasks[idx] for _, idx in task_priorities]
-    
+    sorted_tasks = sorted(file_tasks, key=lambda task: task['priority'])
+    total_renditions = sum(len(task['qualities']) for task in sorted_tasks)
+
     if progress_callback:
-        progress_callback(f"Starting optimized compression of {len(sorted_tasks)} tasks for {len(input_files)} videos")
-    
-    # Process tasks with dynamic resource management
-    completed_tasks = 0
-    skipped_tasks = 0
-    failed_tasks = 0
-    total_tasks = len(sorted_tasks)
-    
+        progress_callback(f"Starting optimized compression of {total_renditions} renditions for {len(sorted_tasks)} videos")
+        if pre_skipped:
+            progress_callback(f"Skipping {pre_skipped} renditions already completed by a previous run")
+
+    # Process files with dynamic resource management
+    completed_files = 0
+    succeeded_renditions = 0
+    skipped_renditions = pre_skipped
+    failed_renditions = 0
+    total_files = len(sorted_tasks)
+
     # Batch processing to manage resource usage
     batch_size = 20  # Process in batches to manage memory
-    
-    for batch_start in range(0, total_tasks, batch_size):
-        batch_end = min(batch_start + batch_size, total_tasks)
+
+    for batch_start in range(0, total_files, batch_size):
+        batch_end = min(batch_start + batch_size, total_files)
         batch_tasks = sorted_tasks[batch_start:batch_end]
-        
+
         if progress_callback:
-            progress_callback(f"Processing batch {batch_start//batch_size + 1} ({batch_start + 1}-{batch_end} of {total_tasks})")
-        
+            progress_callback(f"Processing batch {batch_start//batch_size + 1} ({batch_start + 1}-{batch_end} of {total_files})")
+
         # Determine optimal workers for current batch complexity
         batch_complexities = [task['complexity'] for task in batch_tasks]
         avg_complexity = max(set(batch_complexities), key=batch_complexities.count)  # Most common complexity
         max_workers = resource_monitor.get_optimal_concurrent_count(avg_complexity)
-        
+        # Split the cores across the pool: max_workers ffmpegs each defaulting
+        # to cpu_count threads would schedule workers*cores contending threads
+        threads_per_job = max(1, (os.cpu_count() or 1) // max_workers)
+
         if progress_callback:
             progress_callback(f"Using {max_workers} workers for {avg_complexity} complexity batch")
-        
-        # Use ThreadPoolExecutor for concurrent processing
+
+        # Use ThreadPoolExecutor for concurrent processing, one task per video
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            # Submit batch tasks
-            future_to_task = {
-                executor.submit(
-                    compress_video_with_progress,
+            future_to_task = {}
+            for task in batch_tasks:
+                # Don't queue more encodes while memory is already critical
+                _wait_for_memory_headroom()
+                future = executor.submit(
+                    compress_video_multi,
                     task['input_path'],
                     task['output_dir'],
-                    task['bitrate'],
-                    task['resolution'],
-                    task['hdr_metadata'],
-                    task['dolby_atmos'],
+                    task['qualities'],
+                    dolby_atmos,
+                    task['video_info'],
+                    threads_per_job,
                     progress_callback
-                ): task for task in batch_tasks
-            }
-            
-            # Process completed tasks in this batch
+                )
+                future_to_task[future] = task
+
+            # Process completed files in this batch
             batch_completed = 0
             for future in as_completed(future_to_task):
                 task = future_to_task[future]
                 try:
-                    success, output_file = future.result()
+                    results = future.result()
                     batch_completed += 1
-                    completed_tasks += 1
-                    
-                    if success:
-                        if output_file is None:  # Task was skipped
-                            skipped_tasks += 1
-                    else:
-                        failed_tasks += 1
-                    
+                    completed_files += 1
+
+                    # Legs pruned inside compress_video_multi (output already
+                    # present from an earlier run) count as skipped
+                    skipped_renditions += len(task['qualities']) - len(results)
+                    for _, ok in results:
+                        if ok:
+                            succeeded_renditions += 1
+                        else:
+                            failed_renditions += 1
+
                     if progress_callback:
-                        progress_callback(f"Batch Progress: {batch_completed}/{len(batch_tasks)} | Overall: {completed_tasks}/{total_tasks} (✓{completed_tasks-failed_tasks-skipped_tasks} ⊝{skipped_tasks} ✗{failed_tasks})")
-                    
-                    # Dynamic worker adjustment within batch
-                    if batch_completed % 3 == 0:  # Check every 3 completions
-                        trend = resource_monitor.get_performance_trend()
-                        if trend == "increasing_load":
-                            # System load increasing, consider reducing workers for next batch
-                            pass  # Will be handled in next batch
-                    
+                        progress_callback(f"Batch Progress: {batch_completed}/{len(batch_tasks)} | Overall: {completed_files}/{total_files} files (✓{succeeded_renditions} ⊝{skipped_renditions} ✗{failed_renditions})")
+
                 except Exception as exc:
-                    failed_tasks += 1
-                    completed_tasks += 1
+                    failed_renditions += len(task['qualities'])
+                    completed_files += 1
                     if progress_callback:
                         progress_callback(f"✗ Task failed: {task['task_id']} - {str(exc)}")
                     print(f"Task {task['task_id']} generated an exception: {exc}")
-        
+
         # Brief pause between batches to let system stabilize
         time.sleep(2)
-    
+
     # Final summary
-    successful_tasks = completed_tasks - failed_tasks - skipped_tasks
     if progress_callback:
         progress_callback(f"=== Compression Complete ===")
-        progress_callback(f"Total: {total_tasks} | Successful: {successful_tasks} | Skipped: {skipped_tasks} | Failed: {failed_tasks}")
-        progress_callback(f"Success Rate: {(successful_tasks/total_tasks)*100:.1f}%")
-    
-    print(f"Compression summary: {successful_tasks} successful, {skipped_tasks} skipped, {failed_tasks} failed out of {total_tasks} total tasks")
+        progress_callback(f"Total: {total_renditions} | Successful: {succeeded_renditions} | Skipped: {skipped_renditions} | Failed: {failed_renditions}")
+        if total_renditions:
+            progress_callback(f"Success Rate: {(succeeded_renditions/total_renditions)*100:.1f}%")
+
+    print(f"Compression summary: {succeeded_renditions} successful, {skipped_renditions} skipped, {failed_renditions} failed out of {total_renditions} total renditions")
 
 class LambrkCompressorGUI:
     def __init__(self, root):
@@ -956,44 +1351,21 @@ class LambrkCompressorGUI:
             self.log_message("Output folder does not exist!")
             return
         
-        # Check for video files
-        video_files = [f for f in os.listdir(input_folder) if f.endswith(('.mp4', '.MOV', '.mov', '.avi', '.mkv')) and not f.startswith('._')]
+        # Check for video files; scandir's DirEntry caches the file type so
+        # no per-name stat is needed, and the suffix check is case-blind
+        with os.scandir(input_folder) as entries:
+            video_files = [e.name for e in entries
+                           if e.is_file() and not e.name.startswith('._')
+                           and os.path.splitext(e.name)[1].lower() in VIDEO_EXTENSIONS]
         if not video_files:
             self.log_message("No video files found in the input folder!")
             return
         
-        # Create database job if database is enabled
-        if self.database_enabled and self.crud_service:
-            try:
-                job_name = self.job_name_entry.get() if hasattr(self, 'job_name_entry') else f"Job_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-                
-                # Get quality profiles
-                landscape_qualities, portrait_qualities = self._get_quality_profiles()
-                all_qualities = landscape_qualities + portrait_qualities  # For counting
-                
-                # Create full file paths
-                video_file_paths = [os.path.join(input_folder, f) for f in video_files]
-                
-                # Create database job
-                job = self.crud_service.create_compression_batch(
-                    job_name=job_name,
-                    input_folder=input_folder,
-                    output_folder=output_folder,
-                    video_files=video_file_paths,
-                    quality_profiles=landscape_qualities,  # Use one set for calculation
-                    dolby_atmos_enabled=True
-                )
-                
-                if job:
-                    self.current_job_id = job.id
-                    self.log_message(f"Created database job: {job_name} (ID: {job.id})")
-                else:
-                    self.log_message("Failed to create database job - proceeding without database tracking")
-                    self.current_job_id = None
-            except Exception as e:
-                self.log_message(f"Database error: {e} - proceeding without database tracking")
-                self.current_job_id = None
-        
+        # Batch creation (probing included) happens on the worker thread; only
+        # the job name needs reading here while we're still on the Tk thread
+        job_name = self.job_name_entry.get() if hasattr(self, 'job_name_entry') else f"Job_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.current_job_id = None
+
         # Start compression
         self.is_compressing = True
         self.compress_button.config(state='disabled', text="Compressing...")
@@ -1004,21 +1376,49 @@ class LambrkCompressorGUI:
         self.log_message(f"Input: {input_folder}")
         self.log_message(f"Output: {output_folder}")
         
-        # Update job status to processing if database is enabled
-        if self.current_job_id and self.crud_service:
-            self.crud_service.jobs.update_job_status(self.current_job_id, 'processing')
-        
         # Start compression in a separate thread
-        self.compression_thread = threading.Thread(target=self._run_compression, args=(input_folder, output_folder))
+        self.compression_thread = threading.Thread(target=self._run_compression,
+                                                   args=(input_folder, output_folder, video_files, job_name))
         self.compression_thread.daemon = True
         self.compression_thread.start()
-    
-    def _run_compression(self, input_folder, output_folder):
+
+    def _run_compression(self, input_folder, output_folder, video_files, job_name):
         """Run the compression process with database integration."""
         try:
             # Get quality profiles
             landscape_qualities, portrait_qualities = self._get_quality_profiles()
-            
+
+            # Probe every input once, concurrently, from this worker thread;
+            # batch creation persists these results and the encode path below
+            # reuses them, so neither freezes the UI nor re-probes the files
+            video_file_paths = [os.path.join(input_folder, f) for f in video_files]
+            probed = probe_all(video_file_paths)
+
+            if self.database_enabled and self.crud_service:
+                try:
+                    metadata = {path: video_file_metadata(path, probed.get(path))
+                                for path in video_file_paths}
+                    job = self.crud_service.create_compression_batch(
+                        job_name=job_name,
+                        input_folder=input_folder,
+                        output_folder=output_folder,
+                        video_files=video_file_paths,
+                        quality_profiles=landscape_qualities,  # Use one set for calculation
+                        dolby_atmos_enabled=True,
+                        video_infos=metadata
+                    )
+
+                    if job:
+                        self.current_job_id = job.id
+                        self.log_message(f"Created database job: {job_name} (ID: {job.id})")
+                        self.crud_service.jobs.update_job_status(job.id, 'processing')
+                    else:
+                        self.log_message("Failed to create database job - proceeding without database tracking")
+                        self.current_job_id = None
+                except Exception as e:
+                    self.log_message(f"Database error: {e} - proceeding without database tracking")
+                    self.current_job_id = None
+
             # Update worker count display and record metrics during compression
             def update_worker_display():
                 if self.is_compressing:
@@ -1041,32 +1441,43 @@ class LambrkCompressorGUI:
             worker_update_thread.daemon = True
             worker_update_thread.start()
             
-            # Create enhanced progress callback that updates database
+            # Create enhanced progress callback that updates database.
+            # Every message used to cost two PostgreSQL round-trips; with
+            # streamed encode progress that meant dozens of queries a second.
+            # Coalesce: only completion/failure markers or a one-second timer
+            # elapse actually hit the database, the rest just log.
+            self._last_db_update = 0.0
+
             def database_progress_callback(message):
                 self.log_message(message)
-                
-                # Update job progress in database if enabled
-                if self.current_job_id and self.crud_service:
-                    try:
-                        # Get current task statistics
-                        stats = self.crud_service.tasks.get_task_statistics(self.current_job_id)
-                        
-                        # Update job progress
-                        self.crud_service.jobs.update_job_progress(
-                            job_id=self.current_job_id,
-                            completed_tasks=stats.get('completed_tasks', 0)
-                        )
-                    except Exception as e:
-                        print(f"Error updating job progress: {e}")
+
+                if not (self.current_job_id and self.crud_service):
+                    return
+                now = time.monotonic()
+                if now - self._last_db_update < 1.0 and not message.startswith(('✓', '✗')):
+                    return
+                self._last_db_update = now
+                try:
+                    # Get current task statistics
+                    stats = self.crud_service.tasks.get_task_statistics(self.current_job_id)
+
+                    # Update job progress
+                    self.crud_service.jobs.update_job_progress(
+                        job_id=self.current_job_id,
+                        completed_tasks=stats.get('completed_tasks', 0)
+                    )
+                except Exception as e:
+                    print(f"Error updating job progress: {e}")
             
-            # Run concurrent compression
+            # Run concurrent compression, reusing the probe results from above
             compress_videos_concurrent(
-                input_folder, 
-                output_folder, 
-                landscape_qualities, 
-                portrait_qualities, 
+                input_folder,
+                output_folder,
+                landscape_qualities,
+                portrait_qualities,
                 dolby_atmos=True,
-                progress_callback=database_progress_callback
+                progress_callback=database_progress_callback,
+                video_infos=probed
             )
             
         except Exception as e:
@@ -1087,39 +1498,9 @@ class LambrkCompressorGUI:
     
     def _get_quality_profiles(self):
         """Get quality profiles for landscape and portrait videos."""
-        landscape_qualities = [
-            ("150k", "256x144", {}),
-            ("200k", "426x240", {}),
-            ("300k", "640x360", {}),
-            ("500k", "854x480", {}),
-            ("1000k", "1280x720", {}),
-            ("2000k", "1920x1080", {}),
-            ("4000k", "2560x1440", {}),
-            ("6000k", "3840x2160", {
-                "color_primaries": "bt2020",
-                "transfer_characteristics": "smpte2084",
-                "mastering_display_color_primaries": "bt2020",
-                "mastering_display_luminance": "1000"
-            }),
-        ]
-        
-        portrait_qualities = [
-            ("150k", "256x144", {}),
-            ("200k", "426x240", {}),
-            ("300k", "640x360", {}),
-            ("500k", "854x480", {}),
-            ("1000k", "1280x720", {}),
-            ("2000k", "1920x1080", {}),
-            ("4000k", "2560x1440", {}),
-            ("6000k", "3840x2160", {
-                "color_primaries": "bt2020",
-                "transfer_characteristics": "smpte2084",
-                "mastering_display_color_primaries": "bt2020",
-                "mastering_display_luminance": "1000"
-            }),
-        ]
-        
-        return landscape_qualities, portrait_qualities
+        # The ladder is an immutable module-level tuple, so both profiles can
+        # share the same reference -- no per-call copies
+        return QUALITY_LADDER, QUALITY_LADDER
     
     def show_jobs_history(self):
         """Show jobs history in a new window."""
@@ -1142,25 +1523,24 @@ class LambrkCompressorGUI:
                 tree.heading(col, text=col)
                 tree.column(col, width=120)
             
-            # Get jobs data
-            jobs = self.crud_service.jobs.get_all_jobs(limit=50)
-            
-            for job in jobs:
-                duration = ""
-                if job.duration_seconds:
-                    duration = f"{job.duration_seconds:.1f}s"
-                
-                values = (
+            def job_row(job, completed_tasks):
+                duration = f"{job.duration_seconds:.1f}s" if job.duration_seconds else ""
+                return (
                     job.id,
                     job.job_name,
                     job.status.upper(),
                     job.created_at.strftime("%Y-%m-%d %H:%M"),
                     job.processed_videos,
-                    f"{job.completed_tasks}/{job.total_tasks}",
+                    f"{completed_tasks}/{job.total_tasks}",
                     f"{job.progress_percentage:.1f}%",
                     duration
                 )
-                tree.insert('', 'end', values=values)
+
+            # One joined query returns every job with its live task counts
+            # (no per-job statistics round-trips); the tree isn't packed yet,
+            # so these initial inserts can't trigger per-row redraws
+            for job, _pending, completed in self.crud_service.jobs.get_all_jobs_with_stats(limit=50):
+                tree.insert('', 'end', values=job_row(job, completed))
             
             # Add scrollbar
             scrollbar = ttk.Scrollbar(history_window, orient="vertical", command=tree.yview)
@@ -1186,28 +1566,23 @@ class LambrkCompressorGUI:
                             messagebox.showerror("Error", "Failed to delete job!")
             
             def refresh_jobs():
-                # Clear existing items
-                for item in tree.get_children():
-                    tree.delete(item)
-                
-                # Reload jobs
-                jobs = self.crud_service.jobs.get_all_jobs(limit=50)
-                for job in jobs:
-                    duration = ""
-                    if job.duration_seconds:
-                        duration = f"{job.duration_seconds:.1f}s"
-                    
-                    values = (
-                        job.id,
-                        job.job_name,
-                        job.status.upper(),
-                        job.created_at.strftime("%Y-%m-%d %H:%M"),
-                        job.processed_videos,
-                        f"{job.completed_tasks}/{job.total_tasks}",
-                        f"{job.progress_percentage:.1f}%",
-                        duration
-                    )
-                    tree.insert('', 'end', values=values)
+                # One Tcl call clears every row instead of a delete round-trip
+                # per item
+                tree.delete(*tree.get_children())
+
+                # Format all rows up front so the hot loop below is nothing
+                # but tree.insert calls
+                rows = [job_row(job, completed)
+                        for job, _pending, completed in self.crud_service.jobs.get_all_jobs_with_stats(limit=50)]
+
+                # Unmap the tree during the bulk insert so Tk doesn't relayout
+                # and repaint once per row; repacking costs a single reflow
+                tree.pack_forget()
+                try:
+                    for row in rows:
+                        tree.insert('', 'end', values=row)
+                finally:
+                    tree.pack(side='left', fill='both', expand=True, before=scrollbar)
             
             tk.Button(buttons_frame, text="Refresh", command=refresh_jobs, width=12, height=2,
                      bg="#E0E0E0", fg="black", activebackground="#D0D0D0", activeforeground="black",
@@ -1229,7 +1604,7 @@ class LambrkCompressorGUI:
                 # Get current task statistics
                 stats = self.crud_service.tasks.get_task_statistics(self.current_job_id)
                 
-                self.crud_service.metrics.record_metrics(
+                self.crud_service.metrics.buffer_metrics(
                     job_id=self.current_job_id,
                     cpu_percent=metrics['cpu_percent'],
                     memory_percent=metrics['memory_percent'],
@@ -1242,16 +1617,26 @@ class LambrkCompressorGUI:
     
     def _compression_finished(self):
         """Reset GUI state after compression is finished."""
-        # Update job status in database
-        if self.current_job_id and self.crud_service:
-            try:
-                self.crud_service.jobs.update_job_status(self.current_job_id, 'completed')
-                self.log_message(f"Database job {self.current_job_id} marked as completed")
-            except Exception as e:
-                self.log_message(f"Error updating job status: {e}")
-            finally:
-                self.current_job_id = None
-        
+        # Finalize the job off the Tk thread: the metrics drain and status
+        # UPDATE can stall on a remote database, and this method runs on the
+        # main loop -- the widgets below re-enable immediately either way
+        job_id, self.current_job_id = self.current_job_id, None
+        if job_id and self.crud_service:
+            def finalize_job():
+                try:
+                    # Drain samples still sitting in the metrics buffer; the
+                    # size/time thresholds won't fire again after this run
+                    self.crud_service.metrics.flush_metrics()
+                except Exception as e:
+                    print(f"Error flushing metrics: {e}")
+                try:
+                    self.crud_service.jobs.update_job_status(job_id, 'completed')
+                    self.log_message(f"Database job {job_id} marked as completed")
+                except Exception as e:
+                    self.log_message(f"Error updating job status: {e}")
+
+            threading.Thread(target=finalize_job, daemon=True).start()
+
         compress_text = "Start Database-Tracked Compression" if self.database_enabled else "Start Concurrent Compression"
         self.compress_button.config(state='normal', text=compress_text, wraplength=250, bg="#228B22", fg="white")
         self.stop_button.config(state='disabled')